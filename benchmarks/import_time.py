@@ -0,0 +1,71 @@
+"""Benchmark import time of datautils.core modules.
+Each measurement runs in a fresh interpreter, so module caches do not apply.
+Every case is also timed after an eager `import numpy, pandas`, as the
+modules did before loading them lazily.
+
+Usage: python benchmarks/import_time.py [n_runs]
+"""
+
+import statistics  # type: ignore
+import subprocess  # type: ignore
+import sys  # type: ignore
+
+
+##########################################################################
+
+MODULES = ['datautils.core.db_lib',
+           'datautils.core.df_lib',
+           'datautils.core.num_lib',
+           'datautils.core.utils']
+
+SQLITE_SCRIPT = '''
+from datautils.core import db_lib
+db = db_lib.DB(':memory:')
+db.create('CREATE TABLE T(a INTEGER)')
+db.insert('T', [[1], [2]])
+db.query('SELECT * FROM T')
+db.close()
+'''
+
+EAGER = 'import numpy, pandas\n'
+
+TIMER = '''
+import sys, time
+t = time.perf_counter()
+exec({!r})
+elapsed = time.perf_counter() - t
+pd = sys.modules.get('pandas')
+loaded = pd is not None and type(pd).__name__ != '_LazyModule'
+print(elapsed, loaded)
+'''
+
+
+##########################################################################
+
+def run(script: str, n: int):
+    """Return (median seconds, pandas loaded) for script over n runs."""
+    times, loaded = [], False
+    for _ in range(n):
+        out = subprocess.run([sys.executable, '-c', TIMER.format(script)],
+                             capture_output=True, text=True, check=True)
+        elapsed, loaded_ = out.stdout.split()
+        times.append(float(elapsed))
+        loaded = loaded_ == 'True'
+    return statistics.median(times), loaded
+
+
+def main(n: int):
+    t_pandas, _ = run(EAGER, n)
+    print(f'{"import numpy, pandas":<35} {t_pandas * 1000:8.1f} ms')
+
+    cases = [(f'import {m}', f'import {m}') for m in MODULES]
+    cases.append(('sqlite workflow', SQLITE_SCRIPT))
+    for name, script in cases:
+        t, loaded = run(script, n)
+        t_eager, _ = run(EAGER + script, n)
+        print(f'{name:<35} {t * 1000:8.1f} ms   eager {t_eager * 1000:8.1f} ' +
+              f'ms   {t_eager / t:6.1f}x   pandas loaded: {loaded}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,43 @@
+"""Benchmark text_lib.parse_floats against per-cell str_to_float calls.
+Runs on all-unique values and on values drawn from a small set of strings,
+as in feed files that repeat the same numbers.
+
+Usage: python benchmarks/parse_numbers.py [n_values]
+"""
+
+import sys  # type: ignore
+import time  # type: ignore
+
+import numpy as np  # type: ignore
+
+from datautils.core import text_lib  # type: ignore
+
+
+##########################################################################
+
+def gen_values(n: int, n_unique: int) -> list:
+    """Return n US-style number strings drawn from n_unique values."""
+    rng = np.random.default_rng(0)
+    nums = rng.uniform(-1e6, 1e6, n_unique)
+    strs = np.array([f'{x:,.2f}' for x in nums], dtype=object)
+    return strs[rng.integers(0, n_unique, n)].tolist()
+
+
+def timed(f, *args) -> float:
+    t = time.perf_counter()
+    f(*args)
+    return time.perf_counter() - t
+
+
+def main(n: int):
+    text_lib.parse_floats(['1'])  # load pandas outside the timings
+    for name, n_unique in (('all unique', n), ('10k unique', 10000)):
+        values = gen_values(n, n_unique)
+        t_cell = timed(lambda: [text_lib.str_to_float(v) for v in values])
+        t_vec = timed(text_lib.parse_floats, values)
+        print(f'{name:<12} {n:>10,} values   per-cell {t_cell:7.2f} s   ' +
+              f'parse_floats {t_vec:7.2f} s   {t_cell / t_vec:6.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
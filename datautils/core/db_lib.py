@@ -1,13 +1,15 @@
 """A lightweight database connection wrapper for common operations.
 For ease of testing and modularity, database operations are standalone
 functions, though the common ones are also wrapped by the DB class.
+Pandas and pymysql are only imported when first needed.
 """
 
+from __future__ import annotations
+
 from enum import Enum  # type: ignore
 import logging  # type: ignore
-import pandas as pd  # type: ignore
-import pymysql  # type: ignore
-from typing import List, Optional, Tuple, TypeVar, Union  # type: ignore
+from typing import (TYPE_CHECKING, Dict, List, Optional, Tuple, TypeVar,
+                    Union)  # type: ignore
 import sqlite3  # type: ignore
 
 from datautils.core import log_setup  # type: ignore
@@ -15,6 +17,9 @@ from datautils.core.utils import Error, OK, Status  # type: ignore
 from datautils.internal import db_sqlite  # type: ignore
 from datautils.internal import db_mysql  # type: ignore
 
+if TYPE_CHECKING:
+    import pandas as pd  # type: ignore
+
 
 ##########################################################################
 # Initialize Logging -- set logging level to > 50 to suppress all output
@@ -31,13 +36,16 @@ class DB_Type(Enum):
 
 T = TypeVar('T')
 Rows = List[List[T]]
-QueryResult = Union[Rows, pd.DataFrame]
+QueryResult = Union[Rows, 'pd.DataFrame']
+DTypeMap = Dict[str, str]
 
 
 ##########################################################################
 
 class DB:
-    """A lightweight database connection state holder."""
+    """A lightweight database connection state holder.
+    The connection is established on first use of conn or cur.
+    """
 
     def __init__(self,
                  db_host: str,
@@ -49,31 +57,52 @@ class DB:
         self.INVALID_STATUS = Error('Unknown DB_Type value.')
         self.db_host = db_host
         self.db_type = db_type
-        self.status: Status
-        self.__connect__(db_user, db_pwd, db_name)
-
-    def __connect__(self,
-                    db_user: Optional[str],
-                    db_pwd: Optional[str],
-                    db_name: Optional[str]
-                    ):
+        self.db_user = db_user
+        self.db_pwd = db_pwd
+        self.db_name = db_name
+        self.status: Status = OK()
+        self._conn = None
+        self._cur = None
+
+    @property
+    def conn(self):
+        """DB connection object, connecting if required."""
+        if self._conn is None:
+            self.__connect__()
+        return self._conn
+
+    @property
+    def cur(self):
+        """DB cursor object, connecting if required."""
+        if self._cur is None:
+            self.__connect__()
+        return self._cur
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the DB connection has been established."""
+        return self._conn is not None
+
+    def __connect__(self):
         """Establish DB connection."""
         if self.db_type is DB_Type.SQLITE:
-            self.conn = sqlite3.connect(self.db_host)
-            self.cur = self.conn.cursor()
+            self._conn = sqlite3.connect(self.db_host)
+            self._cur = self._conn.cursor()
             self.status = OK()
-            self.conn.execute('PRAGMA foreign_keys = 1')
+            self._conn.execute('PRAGMA foreign_keys = 1')
             logger.info(f'Connected to Sqlite DB: {self.db_host}')
 
         elif self.db_type is DB_Type.MYSQL:
-            assert db_user is not None
-            assert db_pwd is not None
-            assert db_name is not None
-            self.conn = pymysql.connections.Connection(host=self.db_host,
-                                                       user=db_user,
-                                                       password=db_pwd,
-                                                       database=db_name)
-            self.cur = self.conn.cursor()
+            import pymysql  # type: ignore
+            assert self.db_user is not None
+            assert self.db_pwd is not None
+            assert self.db_name is not None
+            self._conn = pymysql.connections.Connection(
+                host=self.db_host,
+                user=self.db_user,
+                password=self.db_pwd,
+                database=self.db_name)
+            self._cur = self._conn.cursor()
             self.status = OK()
             logger.info('Connected to MySQL DB: {}'.format(self.db_host))
 
@@ -101,19 +130,28 @@ class DB:
     def query(self,
               q: str,
               hdr: bool = False,
-              df: bool = False
+              df: bool = False,
+              dtypes: Optional[DTypeMap] = None,
+              cat_threshold: Optional[float] = None,
+              parse_dates: bool = False
               ) -> Tuple[QueryResult, Status]:
-        """Run query."""
+        """Run query.
+        With df, dtypes optionally maps col names to pandas dtypes, string
+        cols with unique ratio <= cat_threshold become category, and with
+        parse_dates, date cols in the table schema become datetime64.
+        """
         if not valid_query(q):
             logger.error('Invalid query {}'.format(q))
             return [], Error('Invalid query {}'.format(q))
 
         if self.db_type is DB_Type.SQLITE:
             ret, status = (db_sqlite.query(self.cur, q, hdr) if not df else
-                           db_sqlite.query_df(self.cur, q))
+                           db_sqlite.query_df(self.cur, q, dtypes,
+                                              cat_threshold, parse_dates))
         elif self.db_type is DB_Type.MYSQL:
             ret, status = (db_mysql.query(self.cur, q, hdr) if not df else
-                           db_mysql.query_df(self.cur, q))
+                           db_mysql.query_df(self.cur, q, dtypes,
+                                             cat_threshold, parse_dates))
         else:
             ret, status = [], self.INVALID_STATUS
             logger.error('Query failed: {}'.format(self.INVALID_STATUS.msg))
@@ -137,8 +175,11 @@ class DB:
         return status
 
     def close(self) -> Status:
-        """Close DB connection."""
-        status = close(self.conn)
+        """Close DB connection; no-op if never connected."""
+        if not self.connected:
+            return OK()
+        status = close(self._conn)
+        self._conn, self._cur = None, None
         return status
 
 
@@ -153,11 +194,14 @@ def query_once(db_host: str,
                db_type: DB_Type = DB_Type.SQLITE,
                db_user: Optional[str] = None,
                db_pwd: Optional[str] = None,
-               db_name: Optional[str] = None
+               db_name: Optional[str] = None,
+               dtypes: Optional[DTypeMap] = None,
+               cat_threshold: Optional[float] = None,
+               parse_dates: bool = False
                ) -> QueryResult:
     """Convenience function: run single query and close connection."""
     c = DB(db_host, db_type, db_user, db_pwd, db_name)
-    ret, _ = c.query(q, hdr, df)
+    ret, _ = c.query(q, hdr, df, dtypes, cat_threshold, parse_dates)
     c.close()
     return ret
 
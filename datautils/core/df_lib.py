@@ -1,14 +1,33 @@
 """Convenience functions for working with Pandas DataFrames.
 """
 
+from __future__ import annotations
+
 from collections import OrderedDict  # type: ignore
+from concurrent.futures import ProcessPoolExecutor  # type: ignore
+from contextlib import closing  # type: ignore
+import datetime  # type: ignore
+import itertools  # type: ignore
+import json  # type: ignore
 import logging  # type: ignore
-import pandas as pd  # type: ignore
-from typing import (Collection, List, Set, Sequence, Tuple,
-                    TypedDict, TypeVar)  # type: ignore
+from multiprocessing import shared_memory  # type: ignore
+import os  # type: ignore
+import sqlite3  # type: ignore
+import tempfile  # type: ignore
+from typing import (TYPE_CHECKING, Any, Collection, Dict, Iterable, Iterator,
+                    List, Optional, Sequence, Set, Tuple, TypeVar, TypedDict,
+                    Union)  # type: ignore
+
+from datautils.core import log_setup, num_lib  # type: ignore
+from datautils.core.utils import (Error, OK, Matrix, Status,
+                                  lazy_import)  # type: ignore
 
-from datautils.core import log_setup  # type: ignore
-from datautils.core.utils import Error, OK, Matrix, Status  # type: ignore
+if TYPE_CHECKING:
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+else:
+    np = lazy_import('numpy')
+    pd = lazy_import('pandas')
 
 
 ##########################################################################
@@ -26,30 +45,60 @@ Val = str
 Delta = Tuple[Col, Val, Val]  # (col, old new)
 Mod = Tuple[List[Key], List[Delta]]
 
+# long format deltas DF has the key cols followed by these cols
+DELTA_COLS = ['col', 'old', 'new']
+
 
 class DiffDict(TypedDict):
     adds: pd.DataFrame
-    mods: List[Mod]
+    mods: Union[List[Mod], pd.DataFrame, CompactMods]
     retires: pd.DataFrame
 
 
 def diff_df(df1: pd.DataFrame,
             df2: pd.DataFrame,
             keys: List[Col],
-            ignores: List[Col]
+            ignores: List[Col],
+            deltas: bool = False,
+            fingerprint: bool = False,
+            n_workers: int = 1,
+            compact: bool = False,
+            epsilon: Optional[float] = None,
+            epsilon_abs: Optional[float] = None
             ) -> Tuple[DiffDict, Status]:
-    """Find diffs as a DiffDict of changes from df1 to df2."""
+    """Find diffs as a DiffDict of changes from df1 to df2.
+    If deltas, mods is the long DF from find_deltas instead of List[Mod];
+    if compact, mods is a CompactMods.
+    If fingerprint, only rows whose row_fingerprints differ are compared.
+    If n_workers > 1, key hash partitions are diffed in a process pool.
+    If epsilon or epsilon_abs, numeric cols only change beyond that
+    tolerance (see num_lib.approx_eq).
+    """
     dd: DiffDict = {'adds': None, 'mods': [], 'retires': None}
 
     dim_status = compare_dims(df1, df2, True, False)
     if dim_status != OK():
         return dd, dim_status
 
+    if n_workers > 1:
+        dd, status = diff_df_parallel(df1, df2, keys, ignores,
+                                      deltas or compact, fingerprint,
+                                      n_workers, epsilon, epsilon_abs)
+        if compact and status == OK():
+            dd['mods'] = CompactMods.from_deltas(dd['mods'], keys)
+        return dd, status
+
     df1_, df2_, retire_df, new_df = symm_diff_df(df1, df2, keys)
-    mods, dim_status = find_mods(df1_, df2_, keys, ignores)
+    if fingerprint:
+        df1_, df2_ = changed_rows(df1_, df2_, keys, ignores)
+    delta_df, dim_status = find_deltas(df1_, df2_, keys, ignores, epsilon,
+                                       epsilon_abs)
     if dim_status != OK():
         return dd, dim_status
 
+    mods = (delta_df if deltas else
+            CompactMods.from_deltas(delta_df, keys) if compact else
+            deltas_to_mods(delta_df, keys))
     return {'adds': new_df, 'mods': mods, 'retires': retire_df}, OK()
 
 
@@ -59,21 +108,250 @@ def find_mods(df1: pd.DataFrame,
               ignores: List[Col] = []
               ) -> Tuple[List[Mod], Status]:
     """Find all changes as Mods from df1 to df2."""
+    delta_df, status = find_deltas(df1, df2, keys, ignores)
+    return deltas_to_mods(delta_df, keys), status
+
+
+def find_deltas(df1: pd.DataFrame,
+                df2: pd.DataFrame,
+                keys: List[Col],
+                ignores: List[Col] = [],
+                epsilon: Optional[float] = None,
+                epsilon_abs: Optional[float] = None
+                ) -> Tuple[pd.DataFrame, Status]:
+    """Find all changes from df1 to df2 as a long DF (keys..., col, old, new).
+    Both DFs must hold the same keys. Values are compared column-wise, with
+    NaN == NaN treated as unchanged; deltas are ordered by keys, then col.
+    If epsilon or epsilon_abs, numeric cols are compared with
+    num_lib.approx_eq_mask instead of exact equality.
+    """
+    tolerance = epsilon is not None or epsilon_abs is not None
     diff_cols = [col for col in df1.columns
                  if col not in keys and col not in ignores]
+    empty = pd.DataFrame(columns=list(keys) + DELTA_COLS)
     dim_status = compare_dims(df1, df2, True, True)
     if dim_status != OK():
-        return [], dim_status
+        return empty, dim_status
 
     def f(x): return x.sort_values(by=keys).reset_index(drop=True)
     df1_, df2_ = f(df1), f(df2)
 
-    mask = (df1_ != df2_).any(axis=1)
-    df = df1_[mask].merge(df2_[mask], on=keys, suffixes=['_old', '_new'])
-    pairs = [gen_mod(t._asdict(), keys, diff_cols)
-             for t in df.itertuples(index=False)]
+    if any(changed_mask(df1_[k].to_numpy(), df2_[k].to_numpy()).any()
+           for k in keys):
+        return empty, Error('Key mismatch: DFs do not hold the same keys')
+
+    rows, col_ids, olds, news = [], [], [], []
+    for i, col in enumerate(diff_cols):
+        if tolerance and numeric_cols(df1_[col], df2_[col]):
+            idx = np.flatnonzero(~num_lib.approx_eq_mask(
+                num_lib.to_float_array(df1_[col]),
+                num_lib.to_float_array(df2_[col]),
+                0.0 if epsilon is None else epsilon, epsilon_abs))
+        else:
+            idx = np.flatnonzero(changed_mask(df1_[col].to_numpy(),
+                                              df2_[col].to_numpy()))
+        rows.append(idx)
+        col_ids.append(np.full(len(idx), i))
+        olds.append(df1_[col].iloc[idx].to_numpy(dtype=object))
+        news.append(df2_[col].iloc[idx].to_numpy(dtype=object))
+
+    if not rows or sum(len(idx) for idx in rows) == 0:
+        return empty, OK()
+
+    row, col_id = np.concatenate(rows), np.concatenate(col_ids)
+    order = np.lexsort((col_id, row))
+    df = df1_[keys].iloc[row[order]].reset_index(drop=True)
+    df['col'] = np.array(diff_cols, dtype=object)[col_id[order]]
+    df['old'] = np.concatenate(olds)[order]
+    df['new'] = np.concatenate(news)[order]
+    return df, OK()
+
+
+class CompactMods:
+    """Array-backed mods, compatible with List[Mod] for iteration.
+    Changed rows hold one value per key col (key_vals); deltas are stored
+    as a categorical col, with starts[i] to starts[i + 1] the deltas of
+    row i. Old and new values are held per changed col in typed arrays
+    (int, float, bool or datetime where the values allow, else object),
+    with pos the index of each delta in the arrays of its col. Keys and
+    values are str-converted only when Mods are produced.
+    """
+
+    __slots__ = ('keys', 'key_vals', 'starts', 'col', 'pos', 'old', 'new')
+
+    def __init__(self,
+                 keys: List[Col],
+                 key_vals: List[np.ndarray],
+                 starts: np.ndarray,
+                 col: pd.Categorical,
+                 old: Dict[Col, np.ndarray],
+                 new: Dict[Col, np.ndarray]):
+        self.keys = list(keys)
+        self.key_vals = key_vals
+        self.starts = starts
+        self.col = col
+        self.old = old
+        self.new = new
+
+        # index of each delta among the deltas of its col
+        codes = np.asarray(col.codes, dtype=np.int64)
+        order = np.argsort(codes, kind='stable')
+        first = np.searchsorted(codes[order], codes[order])
+        self.pos = np.empty(len(codes), dtype=np.int64)
+        self.pos[order] = np.arange(len(codes)) - first
+
+    @classmethod
+    def from_deltas(cls, deltas: pd.DataFrame, keys: List[Col]
+                    ) -> CompactMods:
+        """Build from long deltas DF (see find_deltas), ordered by keys."""
+        n = len(deltas)
+        vals = [deltas[k].to_numpy() for k in keys]
+        new_row = np.zeros(n, dtype=bool)
+        new_row[:1] = True
+        for v in vals:
+            new_row[1:] |= changed_mask(v[1:], v[:-1])
+        starts = np.append(np.flatnonzero(new_row), n).astype(np.int64)
+
+        col = pd.Categorical(deltas['col'].to_numpy(dtype=object))
+        old, new = deltas['old'].to_numpy(), deltas['new'].to_numpy()
+        masks = [(c, col.codes == i) for i, c in enumerate(col.categories)]
+        return cls(keys, [v[starts[:-1]] for v in vals], starts, col,
+                   {c: infer_array(old[m]) for c, m in masks},
+                   {c: infer_array(new[m]) for c, m in masks})
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    def __getitem__(self, i: int) -> Mod:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('CompactMods index out of range')
+        lo, hi = self.starts[i], self.starts[i + 1]
+        cats = self.col.categories
+        return ([str(boxed(v[i])) for v in self.key_vals],
+                [(str(cats[c]), str(boxed(self.old[cats[c]][p])),
+                  str(boxed(self.new[cats[c]][p])))
+                 for c, p in zip(self.col.codes[lo:hi], self.pos[lo:hi])])
+
+    def __iter__(self) -> Iterator[Mod]:
+        return (self[i] for i in range(len(self)))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CompactMods):
+            return self.to_frame().equals(other.to_frame())
+        return isinstance(other, list) and self.to_mods() == other
+
+    def to_mods(self) -> List[Mod]:
+        """Convert to List[Mod]."""
+        return list(self)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Convert to long deltas DF (keys..., col, old, new)."""
+        rows = np.repeat(np.arange(len(self)), np.diff(self.starts))
+        df = pd.DataFrame({k: v[rows] for k, v in
+                           zip(self.keys, self.key_vals)})
+        df['col'] = np.asarray(self.col, dtype=object)
+        for name, vals in (('old', self.old), ('new', self.new)):
+            out = np.empty(len(rows), dtype=object)
+            for i, c in enumerate(self.col.categories):
+                out[self.col.codes == i] = vals[c]
+            df[name] = out
+        return df[self.keys + DELTA_COLS]
+
+    def save(self, path: str) -> Status:
+        """Save to .npz file without pickling.
+        Typed arrays are saved as is; object arrays are saved as str, with
+        missing values restored as None on load.
+        """
+        status: Status
+        arrays = {'keys': np.array(self.keys, dtype=str),
+                  'starts': self.starts,
+                  'col_codes': self.col.codes,
+                  'col_cats': np.array(self.col.categories, dtype=str)}
+        for i, v in enumerate(self.key_vals):
+            arrays.update(npz_arrays(f'key{i}', v))
+        for i, c in enumerate(self.col.categories):
+            arrays.update(npz_arrays(f'old{i}', self.old[c]))
+            arrays.update(npz_arrays(f'new{i}', self.new[c]))
+        try:
+            with open(path, 'wb') as f:
+                np.savez(f, **arrays)
+            status = OK()
+        except Exception as e:
+            status = Error(str(e))
+            logger.error(f'CompactMods save exception: {path}; {e}')
+        return status
+
+    @classmethod
+    def load(cls, path: str) -> Tuple[Optional[CompactMods], Status]:
+        """Load from .npz file written by save."""
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                keys = z['keys'].tolist()
+                key_vals = [npz_values(z, f'key{i}') for i in range(len(keys))]
+                cats = z['col_cats'].astype(object)
+                col = pd.Categorical.from_codes(z['col_codes'], cats)
+                return cls(keys, key_vals, z['starts'], col,
+                           {c: npz_values(z, f'old{i}')
+                            for i, c in enumerate(cats)},
+                           {c: npz_values(z, f'new{i}')
+                            for i, c in enumerate(cats)}), OK()
+        except Exception as e:
+            logger.error(f'CompactMods load exception: {path}; {e}')
+            return None, Error(str(e))
 
-    return [pair for pair in pairs if pair[1]], OK()
+
+# inferred kinds kept by infer_array; others (e.g. ints with None) stay
+# object, so values str-convert as in deltas_to_mods
+TYPED_KINDS = ('integer', 'floating', 'boolean', 'datetime', 'datetime64',
+               'timedelta', 'timedelta64')
+
+
+def infer_array(vals: np.ndarray) -> np.ndarray:
+    """Object array as an int, float, bool or datetime array if possible,
+    i.e. if no values are missing or they are already float NaN / NaT.
+    """
+    if pd.api.types.infer_dtype(vals, skipna=False) not in TYPED_KINDS:
+        return vals
+    return pd.Series(vals, dtype=object).infer_objects().to_numpy()
+
+
+def boxed(v: Any) -> Any:
+    """numpy datetime / timedelta scalar as pandas Timestamp / Timedelta."""
+    if isinstance(v, np.datetime64):
+        return pd.Timestamp(v)
+    if isinstance(v, np.timedelta64):
+        return pd.Timedelta(v)
+    return v
+
+
+def npz_arrays(name: str, vals: np.ndarray) -> Dict[str, np.ndarray]:
+    """Arrays saving vals to npz: as is, or as str plus a missing mask."""
+    if vals.dtype != object:
+        return {name: vals}
+    na = pd.isna(vals)
+    return {f'{name}_str': np.where(na, '', vals).astype(str),
+            f'{name}_na': na}
+
+
+def npz_values(z: Any, name: str) -> np.ndarray:
+    """Values saved by npz_arrays."""
+    if name in z:
+        return z[name]
+    vals = z[f'{name}_str'].astype(object)
+    vals[z[f'{name}_na']] = None
+    return vals
+
+
+def deltas_to_mods(deltas: pd.DataFrame, keys: List[Col]) -> List[Mod]:
+    """Convert long deltas DF to Mods, str-converting keys and values."""
+    ks = zip(*(deltas[k].to_numpy(dtype=object) for k in keys))
+    vs = zip(deltas['col'], deltas['old'], deltas['new'])
+    return [([str(k) for k in key],
+             [(col, str(old), str(new)) for _, (col, old, new) in group])
+            for key, group in itertools.groupby(zip(ks, vs),
+                                                key=lambda kv: kv[0])]
 
 
 def gen_mod(d: OrderedDict, keys: List[Col], diff_cols: List[Col]) -> Mod:
@@ -94,13 +372,10 @@ def symm_diff_df(df1: pd.DataFrame,
                             pd.DataFrame, pd.DataFrame, ]:
     """Symmetric diff on given keys.
     Return tuple of DFs: (DF1 match, DF2 match, DF1 only, DF2 only).
+    Rows are matched on key tuples and keep their original order and index.
     """
-    both, df1_only, df2_only = symm_diff_cols(df1, df2, cols)
-    def f(xs): return gen_list_pairs(cols, xs)
-    return (filter_cols(df1, f(both)),
-            filter_cols(df2, f(both)),
-            filter_cols(df1, f(df1_only)),
-            filter_cols(df2, f(df2_only)))
+    in2, in1 = isin_keys(df1, df2, cols), isin_keys(df2, df1, cols)
+    return df1[in2], df2[in1], df1[~in2], df2[~in1]
 
 
 def empty_diff_dict(dd: DiffDict) -> bool:
@@ -110,6 +385,571 @@ def empty_diff_dict(dd: DiffDict) -> bool:
             len(dd['retires']) == 0)
 
 
+##########################################################################
+# Parallel Diff
+
+# (shared memory name, dtype str, length) of a column copied to shared memory
+SharedCol = Tuple[str, str, int]
+
+
+class PartitionSpec(TypedDict):
+    cols: List[Col]
+    shared: Dict[Col, SharedCol]
+    pos: Any  # np.ndarray of row positions in the full DF
+    local: pd.DataFrame  # cols not in shared memory, rows at pos
+
+
+def diff_df_parallel(df1: pd.DataFrame,
+                     df2: pd.DataFrame,
+                     keys: List[Col],
+                     ignores: List[Col],
+                     deltas: bool = False,
+                     fingerprint: bool = False,
+                     n_workers: int = 2,
+                     epsilon: Optional[float] = None,
+                     epsilon_abs: Optional[float] = None
+                     ) -> Tuple[DiffDict, Status]:
+    """Find diffs as diff_df, over key hash partitions in a process pool.
+    NumPy-backed cols are passed to workers through shared memory; other
+    cols are pickled per partition. Results match the serial diff_df.
+    """
+    if any(df1[k].dtype != df2[k].dtype for k in keys):
+        logger.warning('Key dtypes differ, using serial diff_df')
+        return diff_df(df1, df2, keys, ignores, deltas, fingerprint,
+                       epsilon=epsilon, epsilon_abs=epsilon_abs)
+
+    part1 = hash_partition(df1, keys, n_workers)
+    part2 = hash_partition(df2, keys, n_workers)
+    shms: List[shared_memory.SharedMemory] = []
+    try:
+        shared1, shared2 = share_cols(df1, shms), share_cols(df2, shms)
+        args = [(partition_spec(df1, shared1, np.flatnonzero(part1 == i)),
+                 partition_spec(df2, shared2, np.flatnonzero(part2 == i)),
+                 keys, ignores, fingerprint, epsilon, epsilon_abs)
+                for i in range(n_workers)]
+        with ProcessPoolExecutor(n_workers) as ex:
+            results = list(ex.map(diff_shared_partition, args))
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+    dd: DiffDict = {'adds': None, 'mods': [], 'retires': None}
+    for *_, status in results:
+        if status != OK():
+            return dd, status
+
+    retire_pos = np.sort(np.concatenate([r[0] for r in results]))
+    add_pos = np.sort(np.concatenate([r[1] for r in results]))
+    delta_df = (pd.concat([r[2] for r in results], ignore_index=True)
+                .sort_values(by=keys, kind='stable', ignore_index=True))
+    mods = delta_df if deltas else deltas_to_mods(delta_df, keys)
+    return {'adds': df2.iloc[add_pos],
+            'mods': mods,
+            'retires': df1.iloc[retire_pos]}, OK()
+
+
+def share_cols(df: pd.DataFrame,
+               shms: List[shared_memory.SharedMemory]
+               ) -> Dict[Col, SharedCol]:
+    """Copy NumPy-backed cols of df to shared memory, appending to shms."""
+    shared = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if not isinstance(dtype, np.dtype) or dtype.kind not in 'biufmM':
+            continue
+        arr = df[col].to_numpy()
+        shm = shared_memory.SharedMemory(create=True,
+                                         size=max(arr.nbytes, 1))
+        shms.append(shm)
+        np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[:] = arr
+        shared[col] = (shm.name, arr.dtype.str, len(arr))
+    return shared
+
+
+def partition_spec(df: pd.DataFrame,
+                   shared: Dict[Col, SharedCol],
+                   pos: np.ndarray
+                   ) -> PartitionSpec:
+    """Describe the rows of df at pos for a worker process."""
+    local_cols = [col for col in df.columns if col not in shared]
+    return {'cols': list(df.columns),
+            'shared': shared,
+            'pos': pos,
+            'local': df[local_cols].iloc[pos]}
+
+
+def partition_df(spec: PartitionSpec) -> pd.DataFrame:
+    """Rebuild partition DF from spec, indexed by row position."""
+    data = {}
+    for col, (name, dtype, n) in spec['shared'].items():
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            arr = np.ndarray((n,), np.dtype(dtype), buffer=shm.buf)
+            data[col] = arr[spec['pos']]
+        finally:
+            shm.close()
+    df = pd.concat([pd.DataFrame(data, index=spec['pos']),
+                    spec['local'].set_axis(spec['pos'])], axis=1)
+    return df[spec['cols']]
+
+
+def diff_shared_partition(args: Tuple[PartitionSpec, PartitionSpec,
+                                      List[Col], List[Col], bool,
+                                      Optional[float], Optional[float]]
+                          ) -> Tuple[np.ndarray, np.ndarray,
+                                     pd.DataFrame, Status]:
+    """Diff one partition, returning retire and add positions and deltas."""
+    spec1, spec2, keys, ignores, fingerprint, epsilon, epsilon_abs = args
+    dd, status = diff_df(partition_df(spec1), partition_df(spec2), keys,
+                         ignores, True, fingerprint, epsilon=epsilon,
+                         epsilon_abs=epsilon_abs)
+    if status != OK():
+        return np.array([], int), np.array([], int), pd.DataFrame(), status
+    return (dd['retires'].index.to_numpy(), dd['adds'].index.to_numpy(),
+            dd['mods'], status)
+
+
+##########################################################################
+# Fingerprints
+
+FP_COL = 'fp'
+
+
+class FingerprintDiff(TypedDict):
+    adds: pd.DataFrame
+    changed: pd.DataFrame
+    retires: pd.DataFrame
+
+
+def row_fingerprints(df: pd.DataFrame,
+                     keys: List[Col],
+                     ignores: List[Col] = []
+                     ) -> pd.DataFrame:
+    """Return DF of keys and FP_COL, a uint64 hash of each row's values.
+    Non-key, non-ignored cols are hashed; hashes depend on dtypes, so
+    snapshots should be loaded with consistent dtypes.
+    """
+    cols = [col for col in df.columns
+            if col not in keys and col not in ignores]
+    fps = df[keys].copy()
+    fps[FP_COL] = (pd.util.hash_pandas_object(df[cols], index=False)
+                   .to_numpy() if cols else np.zeros(len(df), np.uint64))
+    return fps
+
+
+def changed_rows(df1: pd.DataFrame,
+                 df2: pd.DataFrame,
+                 keys: List[Col],
+                 ignores: List[Col] = []
+                 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Restrict DFs holding the same keys to rows whose fingerprint differs."""
+    fp1 = row_fingerprints(df1, keys, ignores)
+    fp2 = row_fingerprints(df2, keys, ignores)
+    m = (fp1.assign(_pos1=np.arange(len(fp1)))
+         .merge(fp2.assign(_pos2=np.arange(len(fp2))), on=keys,
+                suffixes=('_1', '_2')))
+    m = m[m[f'{FP_COL}_1'] != m[f'{FP_COL}_2']]
+    return (df1.iloc[np.sort(m['_pos1'].to_numpy())],
+            df2.iloc[np.sort(m['_pos2'].to_numpy())])
+
+
+def diff_fingerprints(fps: pd.DataFrame,
+                      df: pd.DataFrame,
+                      keys: List[Col],
+                      ignores: List[Col] = []
+                      ) -> Tuple[FingerprintDiff, Status]:
+    """Find changes from stored fingerprints fps to snapshot df.
+    Return rows of df with new keys (adds) and changed fingerprints
+    (changed), and keys of fps missing from df (retires).
+    Ignores must match those used to compute fps.
+    """
+    fd: FingerprintDiff = {'adds': None, 'changed': None, 'retires': None}
+    if not set(keys) | {FP_COL} <= set(fps.columns):
+        return fd, Error(f'Fingerprints missing cols: {keys + [FP_COL]}')
+
+    old = fps.drop_duplicates(subset=keys).copy()
+    try:
+        for k in keys:
+            old[k] = old[k].astype(df[k].dtype)
+    except Exception as e:
+        return fd, Error(f'Fingerprint key dtype mismatch: {e}')
+
+    new = row_fingerprints(df, keys, ignores)
+    in_old, in_new = isin_keys(new, old, keys), isin_keys(old, new, keys)
+
+    m = (new.assign(_pos=np.arange(len(new)))[in_old]
+         .merge(old, on=keys, suffixes=('', '_old')))
+    pos = m.loc[m[FP_COL] != m[f'{FP_COL}_old'], '_pos'].to_numpy()
+
+    return {'adds': df[~in_old],
+            'changed': df.iloc[np.sort(pos)],
+            'retires': old.loc[~in_new, keys]}, OK()
+
+
+class FingerprintStore:
+    """Row fingerprints of a snapshot, persisted in a Sqlite table.
+    Each save or load opens and closes its own connection.
+    """
+
+    def __init__(self, path: str, table: str = 'fingerprints'):
+        self.path = os.path.expanduser(path)
+        self.table = table
+
+    def save(self, fps: pd.DataFrame) -> Status:
+        """Replace stored fingerprints with fps (from row_fingerprints)."""
+        status: Status
+        fps_ = fps.copy()
+        fps_[FP_COL] = fps_[FP_COL].to_numpy(np.uint64).view(np.int64)
+        try:
+            with closing(sqlite3.connect(self.path)) as conn, conn:
+                fps_.to_sql(self.table, conn, if_exists='replace',
+                            index=False)
+            status = OK()
+            logger.info(f'Saved {len(fps)} fingerprints to {self.path}')
+        except Exception as e:
+            status = Error(str(e))
+            logger.error(f'Fingerprint save exception: {self.path}; {e}')
+        return status
+
+    def load(self) -> Tuple[pd.DataFrame, Status]:
+        """Load stored fingerprints."""
+        try:
+            with closing(sqlite3.connect(self.path)) as conn:
+                fps = pd.read_sql(f'SELECT * FROM "{self.table}"', conn)
+        except Exception as e:
+            logger.error(f'Fingerprint load exception: {self.path}; {e}')
+            return pd.DataFrame(), Error(str(e))
+        fps[FP_COL] = fps[FP_COL].to_numpy(np.int64).view(np.uint64)
+        return fps, OK()
+
+    def diff(self,
+             df: pd.DataFrame,
+             keys: List[Col],
+             ignores: List[Col] = []
+             ) -> Tuple[FingerprintDiff, Status]:
+        """Find changes from stored fingerprints to snapshot df."""
+        fps, status = self.load()
+        if status != OK():
+            return {'adds': None, 'changed': None, 'retires': None}, status
+        return diff_fingerprints(fps, df, keys, ignores)
+
+    def update(self,
+               df: pd.DataFrame,
+               keys: List[Col],
+               ignores: List[Col] = []
+               ) -> Status:
+        """Store fingerprints of snapshot df."""
+        return self.save(row_fingerprints(df, keys, ignores))
+
+
+##########################################################################
+# Snapshots
+
+Date = Union[str, datetime.date]
+
+SNAPSHOT_MANIFEST = 'manifest.json'
+
+
+class SnapshotStore:
+    """Dated snapshots of a DF, stored as a base plus a chain of deltas.
+    Each put after the first stores the diff from the previous date (adds,
+    retired keys and long deltas), or a new full base every rebase_every
+    dates, so at most rebase_every - 1 deltas are applied on get.
+    Files are pickles (optionally compressed) in directory path, indexed by
+    a JSON manifest. Snapshots are stored and returned sorted by keys.
+    If the manifest was stored with other keys, status is an Error and put
+    and get return it.
+    """
+
+    def __init__(self,
+                 path: str,
+                 keys: List[Col],
+                 rebase_every: int = 30,
+                 compression: Optional[str] = None):
+        self.path = os.path.expanduser(path)
+        self.keys = list(keys)
+        self.rebase_every = rebase_every
+        self.compression = compression
+        self.last: Optional[Tuple[str, pd.DataFrame]] = None
+        os.makedirs(self.path, exist_ok=True)
+        self.manifest, self.status = self.load_manifest()
+
+    def dates(self) -> List[str]:
+        """Return stored dates in ascending order."""
+        return [e['date'] for e in self.manifest]
+
+    def put(self, date: Date, df: pd.DataFrame) -> Status:
+        """Store snapshot df for date, later than all stored dates."""
+        dd: Dict[str, Any]
+        status: Status
+        if self.status != OK():
+            return self.status
+
+        date_ = str(date)
+        if self.manifest and date_ <= self.manifest[-1]['date']:
+            return Error(f'Snapshot date {date_} not after last stored date')
+
+        df_ = df.sort_values(self.keys, kind='stable', ignore_index=True)
+        since_base = next((i for i, e in enumerate(reversed(self.manifest))
+                           if e['base']), None)
+        if since_base is None or since_base + 1 >= self.rebase_every:
+            dd, status = {}, Error('Rebase due')
+        else:
+            dd, status = self.diff_last(df_)
+
+        entry = {'date': date_, 'base': status != OK()}
+        obj = (df_ if entry['base'] else
+               {'adds': dd['adds'],
+                'retires': dd['retires'][self.keys],
+                'mods': dd['mods']})
+        try:
+            pd.to_pickle(obj, self.snapshot_path(entry),
+                         compression=self.compression)
+            self.manifest.append(entry)
+            status = self.save_manifest()
+        except Exception as e:
+            status = Error(str(e))
+            logger.error(f'Snapshot put exception: {date_}; {e}')
+            return status
+
+        self.last = (date_, df_)
+        return status
+
+    def get(self, date: Date) -> Tuple[pd.DataFrame, Status]:
+        """Reconstruct snapshot for date from its base and deltas."""
+        if self.status != OK():
+            return pd.DataFrame(), self.status
+
+        date_ = str(date)
+        if self.last is not None and self.last[0] == date_:
+            return self.last[1].copy(), OK()
+
+        i = next((i for i, e in enumerate(self.manifest)
+                  if e['date'] == date_), None)
+        if i is None:
+            return pd.DataFrame(), Error(f'No snapshot for date {date_}')
+
+        # start from the cached frame if it lies on the chain before date
+        base = max(j for j in range(i + 1) if self.manifest[j]['base'])
+        last = -1 if self.last is None else self.dates().index(self.last[0])
+        try:
+            if base <= last < i:
+                start, df = last, self.last[1]  # type: ignore
+            else:
+                start, df = base, pd.read_pickle(
+                    self.snapshot_path(self.manifest[base]),
+                    compression=self.compression)
+            for entry in self.manifest[start + 1:i + 1]:
+                delta = pd.read_pickle(self.snapshot_path(entry),
+                                       compression=self.compression)
+                df = apply_diff(df, delta, self.keys)
+        except Exception as e:
+            logger.error(f'Snapshot get exception: {date_}; {e}')
+            return pd.DataFrame(), Error(str(e))
+
+        self.last = (date_, df)
+        return df.copy(), OK()
+
+    def diff_last(self, df: pd.DataFrame) -> Tuple[Any, Status]:
+        """Diff from the last stored snapshot to df.
+        Changed cols or dtypes return an Error, so put stores a new base.
+        """
+        last, status = self.get(self.manifest[-1]['date'])
+        if (status != OK() or list(last.columns) != list(df.columns) or
+                not last.dtypes.equals(df.dtypes)):
+            return {}, Error('Snapshot cols or dtypes changed')
+        return diff_df(last, df, self.keys, [], deltas=True)
+
+    def snapshot_path(self, entry: Dict[str, Any]) -> str:
+        kind = 'base' if entry['base'] else 'delta'
+        return os.path.join(self.path, f'{entry["date"]}.{kind}.pkl')
+
+    def load_manifest(self) -> Tuple[List[Dict[str, Any]], Status]:
+        f = os.path.join(self.path, SNAPSHOT_MANIFEST)
+        if not os.path.exists(f):
+            return [], OK()
+        with open(f) as fh:
+            manifest = json.load(fh)
+        if manifest['keys'] != self.keys:
+            msg = (f'Snapshot keys {self.keys} do not match stored keys ' +
+                   f'{manifest["keys"]} in {f}')
+            logger.error(msg)
+            return manifest['dates'], Error(msg)
+        return manifest['dates'], OK()
+
+    def save_manifest(self) -> Status:
+        status: Status
+        f = os.path.join(self.path, SNAPSHOT_MANIFEST)
+        try:
+            with open(f + '.tmp', 'w') as fh:
+                json.dump({'keys': self.keys, 'dates': self.manifest}, fh)
+            os.replace(f + '.tmp', f)
+            status = OK()
+        except Exception as e:
+            status = Error(str(e))
+            logger.error(f'Snapshot manifest exception: {f}; {e}')
+        return status
+
+
+def apply_diff(df: pd.DataFrame,
+               dd: Dict[str, pd.DataFrame],
+               keys: List[Col]
+               ) -> pd.DataFrame:
+    """Apply adds, retired keys and long deltas (see find_deltas) to df.
+    Mods are assigned per changed col with positional indexing; the result
+    is sorted by keys.
+    """
+    adds, retires, mods = dd['adds'], dd['retires'], dd['mods']
+    df = df[~isin_keys(df, retires, keys)].reset_index(drop=True)
+
+    if len(mods):
+        index = pd.MultiIndex.from_frame(df[keys])
+        for col, sub in mods.groupby('col', sort=False):
+            pos = index.get_indexer(pd.MultiIndex.from_frame(sub[keys]))
+            vals = df[col].to_numpy(dtype=object, copy=True)
+            vals[pos] = sub['new'].to_numpy(dtype=object)
+            df[col] = typed_like(vals, df[col].dtype)
+
+    if len(adds):
+        df = pd.concat([df, adds], ignore_index=True)
+    return df.sort_values(keys, kind='stable', ignore_index=True)
+
+
+def typed_like(vals: np.ndarray, dtype: Any) -> pd.Series:
+    """Cast object array to dtype, or infer a dtype if values do not fit.
+    The cast is only kept if it preserves every value (e.g. not 1.5 to int
+    or None to bool).
+    """
+    try:
+        s = pd.Series(vals).astype(dtype)
+        if not changed_mask(s.to_numpy(dtype=object), vals).any():
+            return s
+    except (TypeError, ValueError):
+        pass
+    return pd.Series(vals).infer_objects()
+
+
+##########################################################################
+# Out-of-core Diff
+
+DiffPaths = Tuple[str, str, List[Col], List[Col]]
+
+
+def diff_files(path1: str,
+               path2: str,
+               keys: List[Col],
+               ignores: List[Col],
+               partitions: int = 16,
+               n_workers: int = 1,
+               out_dir: Optional[str] = None,
+               chunksize: int = 1000000,
+               delim: str = ',',
+               tmp_dir: Optional[str] = None
+               ) -> Tuple[DiffDict, Status]:
+    """Find diffs from CSV file path1 to path2 without loading either fully.
+    Rows are hash partitioned by keys into temporary spill files (under
+    tmp_dir, default the system temp dir), and each partition pair is
+    diffed with diff_df, optionally in n_workers processes.
+    All values are read as strings, so comparison is on the text.
+    If out_dir is given, adds.csv, retires.csv and mods.csv (long deltas,
+    grouped by partition) are written there and the DiffDict is empty.
+    """
+    dd: DiffDict = {'adds': pd.DataFrame(), 'mods': [],
+                    'retires': pd.DataFrame()}
+
+    hdr1 = list(pd.read_csv(path1, sep=delim, nrows=0).columns)
+    hdr2 = list(pd.read_csv(path2, sep=delim, nrows=0).columns)
+    if hdr1 != hdr2 or not set(keys) <= set(hdr1):
+        return dd, Error(f'Header mismatch or missing keys: {hdr1} vs {hdr2}')
+
+    tmp_dir_ = os.path.expanduser(tmp_dir) if tmp_dir is not None else None
+    with tempfile.TemporaryDirectory(dir=tmp_dir_) as tmp:
+        for side, path in (('1', path1), ('2', path2)):
+            spill_partitions(path, hdr1, keys, partitions, tmp, side,
+                             chunksize, delim)
+
+        args = [(spill_path(tmp, '1', i), spill_path(tmp, '2', i),
+                 keys, ignores) for i in range(partitions)]
+        if n_workers > 1:
+            with ProcessPoolExecutor(n_workers) as ex:
+                results = list(ex.map(diff_partition, args))
+        else:
+            results = [diff_partition(a) for a in args]
+
+    for d, status in results:
+        if status != OK():
+            return dd, status
+
+    if out_dir is not None:
+        write_diff_files([d for d, _ in results], out_dir)
+        return dd, OK()
+
+    deltas = pd.concat([d['mods'] for d, _ in results], ignore_index=True)
+    deltas = deltas.sort_values(by=keys, kind='stable')
+    return {'adds': pd.concat([d['adds'] for d, _ in results],
+                              ignore_index=True),
+            'mods': deltas_to_mods(deltas, keys),
+            'retires': pd.concat([d['retires'] for d, _ in results],
+                                 ignore_index=True)}, OK()
+
+
+def spill_partitions(path: str,
+                     hdr: List[Col],
+                     keys: List[Col],
+                     partitions: int,
+                     tmp: str,
+                     side: str,
+                     chunksize: int,
+                     delim: str
+                     ):
+    """Stream CSV at path into one spill file per key hash partition."""
+    for i in range(partitions):
+        pd.DataFrame(columns=hdr).to_csv(spill_path(tmp, side, i),
+                                         index=False)
+
+    reader = pd.read_csv(path, sep=delim, dtype=str, keep_default_na=False,
+                         chunksize=chunksize)
+    for chunk in reader:
+        part = hash_partition(chunk, keys, partitions)
+        for i, g in chunk.groupby(part):
+            g.to_csv(spill_path(tmp, side, i), mode='a', header=False,
+                     index=False)
+
+
+def diff_partition(args: DiffPaths) -> Tuple[DiffDict, Status]:
+    """Diff one pair of spill files, returning mods as long deltas."""
+    path1, path2, keys, ignores = args
+
+    def f(p): return pd.read_csv(p, dtype=str, keep_default_na=False)
+    return diff_df(f(path1), f(path2), keys, ignores, True)
+
+
+def write_diff_files(dds: List[DiffDict], out_dir: str):
+    """Write adds, retires and long delta mods of DiffDicts as CSV files."""
+    for name in ('adds', 'retires', 'mods'):
+        path = os.path.join(out_dir, f'{name}.csv')
+        for i, d in enumerate(dds):
+            df = d[name]
+            if isinstance(df, pd.DataFrame):  # mods are long deltas here
+                df.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0,
+                          index=False)
+
+
+def spill_path(tmp: str, side: str, i: int) -> str:
+    """Path of spill file for given side and partition."""
+    return os.path.join(tmp, f'part{side}_{i}.csv')
+
+
+def hash_partition(df: pd.DataFrame,
+                   keys: List[Col],
+                   partitions: int
+                   ) -> np.ndarray:
+    """Assign each row a partition in [0, partitions) by hash of keys."""
+    h = pd.util.hash_pandas_object(df[keys], index=False).to_numpy()
+    return (h % np.uint64(partitions)).astype(np.int64)
+
+
 ##########################################################################
 # Filtering
 
@@ -130,6 +970,64 @@ def filter(df, **kwargs):
     return df.query(query)
 
 
+class FilterIndex:
+    """Hash index on cols of a DF for repeated equality and isin lookups.
+    The index is built on first lookup in one groupby pass; lookups then
+    cost O(result). Call invalidate() after the DF changes.
+    """
+
+    def __init__(self, df: pd.DataFrame, cols: List[Col]):
+        self.df = df
+        self.cols = list(cols)
+        self._index: Optional[Dict[Any, np.ndarray]] = None
+
+    @property
+    def index(self) -> Dict[Any, np.ndarray]:
+        """Map of key (scalar for one col, else tuple) to row positions."""
+        if self._index is None:
+            by = self.cols[0] if len(self.cols) == 1 else self.cols
+            self._index = self.df.groupby(by, sort=False,
+                                          dropna=False).indices
+        return self._index
+
+    def invalidate(self):
+        """Drop the index so it is rebuilt on next lookup."""
+        self._index = None
+
+    def positions(self, **kwargs) -> np.ndarray:
+        """Row positions where cols == kwargs values.
+        Kwargs must include all index cols; other cols are compared on
+        the matched rows only.
+        """
+        missing = [col for col in self.cols if col not in kwargs]
+        if missing:
+            raise ValueError(f'Missing index cols: {missing}')
+
+        key = (kwargs[self.cols[0]] if len(self.cols) == 1 else
+               tuple(kwargs[col] for col in self.cols))
+        pos = self.index.get(key, np.array([], dtype=np.int64))
+
+        for col in set(kwargs) - set(self.cols):
+            pos = pos[self.df[col].to_numpy()[pos] == kwargs[col]]
+        return pos
+
+    def isin_positions(self, keys: Collection) -> np.ndarray:
+        """Row positions whose key is in keys, in DF order.
+        Keys are scalars for a single col index, else tuples.
+        """
+        found = [self.index[k] for k in keys if k in self.index]
+        return (np.sort(np.concatenate(found)) if found else
+                np.array([], dtype=np.int64))
+
+    def filter(self, **kwargs) -> pd.DataFrame:
+        """Rows where cols == kwargs values (see positions)."""
+        return self.df.iloc[self.positions(**kwargs)]
+
+    def isin(self, keys: Collection) -> pd.DataFrame:
+        """Rows whose key is in keys (see isin_positions)."""
+        return self.df.iloc[self.isin_positions(keys)]
+
+
 def filter_cols(df: pd.DataFrame, conds: List[ListPair]) -> pd.DataFrame:
     """Filter DF based on one or more column value filters."""
     query_list = []
@@ -152,44 +1050,261 @@ def gen_list_pairs(cols: List[Col],
 ##########################################################################
 # Uniqueness
 
-def split_unique(df: pd.DataFrame, keys: List[Col],) -> pd.DataFrame:
+def split_unique(df: pd.DataFrame,
+                 keys: List[Col],
+                 sizes: bool = False
+                 ) -> Union[Tuple[pd.DataFrame, pd.DataFrame],
+                            Tuple[pd.DataFrame, pd.DataFrame, pd.Series]]:
     """Split DF based on unique key cols.
-    REturn (DF with duplicate key cols, DF with unique key cols).
+    Return (DF with duplicate key cols, DF with unique key cols), and if
+    sizes, also the row count of each duplicate key group.
+    An empty partition is returned as an empty DataFrame().
     """
-    dup_cols_set = [cols for cols, g in df.groupby(keys)
-                    if len(g) >= 2]
-    uniq_cols_set = [cols for cols, g in df.groupby(keys)
-                     if len(g) == 1]
-
-    dfs = []
-    for cols_set in (dup_cols_set, uniq_cols_set):
-        if not cols_set:
-            dfs.append(pd.DataFrame())
-            continue
+    mask = df.duplicated(subset=keys, keep=False).to_numpy()
+    dup_df = df[mask] if mask.any() else pd.DataFrame()
+    uniq_df = df[~mask] if not mask.all() else pd.DataFrame()
+    if not sizes:
+        return dup_df, uniq_df
 
-        # cols_set should be List[Sequence[str]]
-        if not isinstance(cols_set[0], tuple):
-            cols_set = [[cols] for cols in cols_set]
-        conds = gen_list_pairs(keys, cols_set)
-        dfs.append(filter_cols(df, conds))
-
-    dup_df, uniq_df = dfs[0], dfs[1]
-    return dup_df, uniq_df
+    dup_sizes = (df[mask].groupby(keys, sort=False, dropna=False).size()
+                 .rename('size'))
+    return dup_df, uniq_df, dup_sizes
 
 
 ##########################################################################
 # Converters
 
+DTypeMap = Dict[Col, str]
+
+# rows per chunk when converting between DFs and rows
+CHUNKSIZE = 100000
+
+# max ratio of unique to total values for a string col to become category
+CAT_THRESHOLD = 0.5
+
+
 def df_to_matrix(df: pd.DataFrame, hdr: bool = False) -> Matrix:
-    """Convert DF to list of lists."""
-    m = df.to_numpy().tolist()
+    """Convert DF to list of lists, preserving per-col Python types."""
+    m = [list(row) for row in iter_rows(df)]
     return m if not hdr else [list(df.columns)] + m
 
 
-def matrix_to_df(m: Matrix, hdr: bool = True) -> pd.DataFrame:
-    """Convert list of lists to DF."""
-    return (pd.DataFrame(m) if not hdr else
-            pd.DataFrame(m[1:], columns=m[0]))
+def iter_rows(df: pd.DataFrame,
+              chunksize: int = CHUNKSIZE
+              ) -> Iterator[Tuple]:
+    """Lazily yield DF rows as tuples, converting chunksize rows at a time.
+    Cols are converted separately, so mixed dtypes are never coerced into
+    one object array.
+    """
+    for i in range(0, len(df), chunksize):
+        chunk = df.iloc[i:i + chunksize]
+        yield from zip(*(chunk.iloc[:, j].tolist()
+                         for j in range(chunk.shape[1])))
+
+
+def matrix_to_df(m: Iterable[Sequence],
+                 hdr: bool = True,
+                 dtypes: Optional[DTypeMap] = None,
+                 chunksize: int = CHUNKSIZE
+                 ) -> pd.DataFrame:
+    """Convert list of lists, or any iterable of rows, to DF.
+    With hdr, the first row holds the col names.
+    """
+    it = iter(m)
+    cols = list(next(it, [])) if hdr else None
+    return rows_to_df(it, cols, dtypes, None, chunksize)
+
+
+def typed_df(rows: Iterable[Sequence],
+             cols: List[Col],
+             dtypes: Optional[DTypeMap] = None,
+             cat_threshold: Optional[float] = None
+             ) -> pd.DataFrame:
+    """Build DF column by column from rows, applying dtypes.
+    Cols missing from dtypes keep the inferred dtype, except for string cols
+    with unique ratio <= cat_threshold (e.g. CAT_THRESHOLD), which are
+    stored as category.
+    Any datetime64 dtype (incl. unitless 'datetime64') parses the col as
+    dates; values that do not parse become NaT and are logged as warnings.
+    """
+    return rows_to_df(rows, cols, dtypes, cat_threshold)
+
+
+def rows_to_df(rows: Iterable[Sequence],
+               cols: Optional[List[Col]] = None,
+               dtypes: Optional[DTypeMap] = None,
+               cat_threshold: Optional[float] = None,
+               chunksize: int = CHUNKSIZE
+               ) -> pd.DataFrame:
+    """Build DF from an iterable of rows, chunksize rows at a time.
+    Each chunk is converted to typed cols before the next is read, so only
+    one chunk of rows is held as Python objects. Without cols, cols are
+    numbered from the width of the first row. Shorter rows are padded with
+    missing values; longer rows raise ValueError. See typed_df for dtypes.
+    Cols without a given dtype whose chunks were inferred differently (e.g.
+    an all-NULL chunk) are re-inferred over all values, so the result does
+    not depend on chunksize.
+    """
+    it, dtypes_ = iter(rows), dtypes if dtypes else {}
+    cols_: List[Any] = list(cols) if cols is not None else []
+    chunks: List[List[pd.Series]] = []
+    while True:
+        chunk = list(itertools.islice(it, chunksize))
+        if not chunk:
+            break
+        if cols is None and not chunks:
+            cols_ = list(range(len(chunk[0])))
+        offset = len(chunks) * chunksize
+        chunk = padded_rows(chunk, len(cols_), offset)
+        chunks.append([typed_col(vals, dtypes_.get(col), None, col, offset)
+                       for col, vals in zip(cols_, zip(*chunk))])
+
+    # chunks are released col by col, so each col is only copied once
+    data = {}
+    for i, col in enumerate(cols_):
+        parts = [c[i] for c in chunks]
+        for c in chunks:
+            c[i] = None
+        s = (concat_cols(parts) if parts else
+             typed_col([], dtypes_.get(col), None))
+        if col not in dtypes_ and len({p.dtype for p in parts}) > 1:
+            s = pd.Series(s.tolist())
+        del parts
+        if col not in dtypes_ and low_cardinality(s, cat_threshold):
+            s = s.astype('category')
+        data[i] = s
+
+    df = pd.DataFrame(data, columns=list(range(len(cols_))), copy=False)
+    df.columns = cols_
+    return df
+
+
+def padded_rows(rows: List[Sequence], n: int, offset: int = 0
+                ) -> List[Sequence]:
+    """Pad rows shorter than n with None, as pd.DataFrame does.
+    Raises ValueError for rows longer than n, numbered from offset.
+    """
+    widths = [len(r) for r in rows]
+    if all(w == n for w in widths):
+        return rows
+    for i, w in enumerate(widths):
+        if w > n:
+            raise ValueError(f'Row {offset + i} has {w} values for {n} cols')
+    return [list(r) + [None] * (n - w) for r, w in zip(rows, widths)]
+
+
+def typed_col(vals: Sequence,
+              dtype: Optional[str] = None,
+              cat_threshold: Optional[float] = None,
+              col: Optional[Col] = None,
+              offset: int = 0
+              ) -> pd.Series:
+    """Build Series from values with given or inferred dtype.
+    Unparseable dates are logged with their row (offset + position) in col.
+    """
+    if dtype is None:
+        s = pd.Series(list(vals))
+        return (s.astype('category') if low_cardinality(s, cat_threshold)
+                else s)
+    if dtype.startswith('datetime64'):
+        raw = pd.Series(list(vals), dtype=object)
+        s = pd.to_datetime(raw, errors='coerce')
+        bad = np.flatnonzero(s.isna() & raw.notna())
+        if len(bad):
+            logger.warning(f'Coerced {len(bad)} unparseable dates to NaT ' +
+                           f'in col {col}: rows {(bad + offset)[:10]} ' +
+                           f'values {raw.iloc[bad[:10]].tolist()}')
+        return s if dtype == 'datetime64' else s.astype(dtype)
+    return pd.Series(list(vals), dtype=dtype)
+
+
+def concat_cols(cols: List[pd.Series]) -> pd.Series:
+    """Concat chunks of a col, unioning categories of categorical chunks."""
+    if len(cols) == 1:
+        return cols[0]
+    if all(isinstance(c.dtype, pd.CategoricalDtype) for c in cols):
+        return pd.Series(pd.api.types.union_categoricals(cols))
+    return pd.concat(cols, ignore_index=True)
+
+
+def optimize_memory(df: pd.DataFrame,
+                    categorical_threshold: Optional[float] = CAT_THRESHOLD,
+                    inplace: bool = False,
+                    parse_numeric: bool = False
+                    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Shrink DF cols to smaller dtypes where lossless.
+    Ints and floats are downcast, and string cols with unique ratio
+    <= categorical_threshold become category. If parse_numeric, string cols
+    are parsed as numbers first when every value formats back to the same
+    string ('12', '2.5'; not '012' or '2.50').
+    Return (DF, report of dtype and deep memory bytes per col).
+    """
+    df_ = df if inplace else df.copy()
+    report = []
+    for col in df_.columns:
+        s = df_[col]
+        s_ = optimize_col(s, categorical_threshold, parse_numeric)
+        if s_ is not s:
+            df_[col] = s_
+        report.append([col, str(s.dtype), str(s_.dtype),
+                       s.memory_usage(index=False, deep=True),
+                       s_.memory_usage(index=False, deep=True)])
+
+    cols = ['col', 'dtype_before', 'dtype_after', 'bytes_before',
+            'bytes_after']
+    return df_, pd.DataFrame(report, columns=cols).set_index('col')
+
+
+def optimize_col(s: pd.Series,
+                 categorical_threshold: Optional[float] = CAT_THRESHOLD,
+                 parse_numeric: bool = False
+                 ) -> pd.Series:
+    """Return s with the smallest lossless dtype, or s itself."""
+    types = pd.api.types
+    if types.is_bool_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+
+    if types.is_integer_dtype(s) and isinstance(s.dtype, np.dtype):
+        return pd.to_numeric(s, downcast='integer')
+
+    if types.is_float_dtype(s) and isinstance(s.dtype, np.dtype):
+        s32 = s.astype(np.float32)
+        lossless = np.array_equal(s32.to_numpy(np.float64), s.to_numpy(),
+                                  equal_nan=True)
+        return s32 if lossless and s.dtype != np.float32 else s
+
+    if types.infer_dtype(s, skipna=True) not in ('string', 'mixed'):
+        return s
+
+    if parse_numeric and s.notna().any():
+        num = pd.to_numeric(s, errors='coerce')
+        if (num.notna().sum() == s.notna().sum() and
+                numeric_roundtrip(s, num)):
+            return optimize_col(num.astype(np.float64)
+                                if num.isna().any() else num)
+
+    return (s.astype('category') if low_cardinality(s, categorical_threshold)
+            else s)
+
+
+def numeric_roundtrip(s: pd.Series, num: pd.Series) -> bool:
+    """Return True if parsed num formats back to the values of s."""
+    mask = s.notna()
+    vals = num[mask]
+    strs = vals.astype(str)
+    if pd.api.types.is_float_dtype(vals):  # format whole floats as ints
+        whole = (vals % 1 == 0) & (vals.abs() < 2 ** 53)
+        strs[whole] = vals[whole].astype(np.int64).astype(str)
+    return bool((strs == s[mask].astype(str)).all())
+
+
+def low_cardinality(s: pd.Series, threshold: Optional[float]) -> bool:
+    """Return True if s is a string col with unique ratio <= threshold."""
+    if threshold is None or len(s) == 0:
+        return False
+    if pd.api.types.infer_dtype(s, skipna=True) != 'string':
+        return False
+    return s.nunique(dropna=False) / len(s) <= threshold
 
 
 ##########################################################################
@@ -198,6 +1313,26 @@ def matrix_to_df(m: Matrix, hdr: bool = True) -> pd.DataFrame:
 ColsSet = Set[Tuple[Col, ...]]
 
 
+def changed_mask(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Elementwise a != b, treating missing values on both sides as equal.
+    Values are only compared where neither side is missing, so pd.NA in
+    nullable cols (e.g. Int64, boolean) is never cast to bool.
+    """
+    if a.dtype != b.dtype:
+        a, b = a.astype(object), b.astype(object)
+    na_a, na_b = pd.isna(a), pd.isna(b)
+    ne = na_a != na_b
+    both = ~(na_a | na_b)
+    ne[both] = np.asarray(a[both] != b[both], dtype=bool)
+    return ne
+
+
+def numeric_cols(*cols: pd.Series) -> bool:
+    """Return True if all cols are numeric and not bool."""
+    return all(pd.api.types.is_numeric_dtype(col) and
+               not pd.api.types.is_bool_dtype(col) for col in cols)
+
+
 def compare_dims(df1: pd.DataFrame,
                  df2: pd.DataFrame,
                  cols: bool = True,
@@ -233,6 +1368,17 @@ def symm_diff_cols(df1: pd.DataFrame,
     return k1 & k2, k1 - k2, k2 - k1
 
 
+def isin_keys(df: pd.DataFrame,
+              other: pd.DataFrame,
+              cols: List[Col]
+              ) -> np.ndarray:
+    """Mask of rows in df whose key tuple on cols also occurs in other."""
+    if len(cols) == 1:
+        return df[cols[0]].isin(other[cols[0]]).to_numpy()
+    keys = pd.MultiIndex.from_frame(df[cols])
+    return keys.isin(pd.MultiIndex.from_frame(other[cols]))
+
+
 def cols_to_set(df: pd.DataFrame, cols: List[str]) -> ColsSet:
     """Return given cols from DF as a set."""
     return set(tuple(ks) for ks in df_to_matrix(df[cols]))
@@ -260,3 +1406,33 @@ def merge_col(series: pd.Series,
     return (series.sum() if name in sum_cols else
             series.mean() if name in avg_cols else
             series.unique()[0])
+
+
+def merge_rows_by(df: pd.DataFrame,
+                  keys: List[Col],
+                  sum_cols: List[str],
+                  avg_cols: List[str],
+                  uniq_cols: List[str],
+                  report: bool = False
+                  ) -> Union[pd.DataFrame, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """Merge rows per group of keys as merge_rows, in one groupby pass.
+    Groups are in order of first appearance; cols other than keys, sum_cols
+    and avg_cols take the group's first value.
+    If report, also return the number of distinct values per uniq_col for
+    groups where some uniq_col is not unique.
+    """
+    g = df.groupby(keys, sort=False, dropna=False)
+    first = ~df.duplicated(subset=keys).to_numpy()
+    merged = df[first].reset_index(drop=True)
+    for cols, agg in ((sum_cols, 'sum'), (avg_cols, 'mean')):
+        if cols:
+            aggs = g[cols].agg(agg)
+            for col in cols:
+                merged[col] = aggs[col].to_numpy()
+    if not report:
+        return merged
+
+    counts = g[uniq_cols].nunique(dropna=False) if uniq_cols else None
+    conflicts = (counts[(counts > 1).any(axis=1)].reset_index()
+                 if counts is not None else pd.DataFrame(columns=keys))
+    return merged, conflicts
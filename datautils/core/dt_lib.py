@@ -1,12 +1,28 @@
 """Datetime convenience functions.
 """
 
+from __future__ import annotations
+
+import calendar  # type: ignore
+from collections import deque  # type: ignore
+from functools import lru_cache  # type: ignore
+import itertools  # type: ignore
 import logging  # type: ignore
 import datetime as dt  # type: ignore
-from typing import Collection, List, Optional
+from typing import (TYPE_CHECKING, Any, Collection, Dict, FrozenSet,
+                    Iterable, Iterator, List, Optional, Pattern, Set, Tuple,
+                    Union)
 import re  # type: ignore
 
 from datautils.core import log_setup  # type: ignore
+from datautils.core.utils import lazy_import  # type: ignore
+
+if TYPE_CHECKING:
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+else:
+    np = lazy_import('numpy')
+    pd = lazy_import('pandas')
 
 
 ##########################################################################
@@ -32,8 +48,8 @@ def get_date(date: dt.date,
              holidays: Optional[Collection[dt.date]] = None
              ) -> dt.date:
     """Get date with specifid time delta."""
-    i = 0 if delta <= 0 else -1
-    return get_dates(date, delta, skip_weekend, holidays)[i]
+    return deque(iter_dates(date, delta, skip_weekend, holidays),
+                 maxlen=1)[0]
 
 
 def get_dates(date: dt.date,
@@ -42,42 +58,306 @@ def get_dates(date: dt.date,
               holidays: Optional[Collection[dt.date]] = None
               ) -> List[dt.date]:
     """Get dates in give delta range, inclusive of date."""
-    i = -1 if delta < 0 else 1
-    date_, dates = date, [date]
-    while delta != 0:
-        date_ += dt.timedelta(days=i)
-        if (skip_weekend and not is_weekday(date_) or
-                holidays and date_ in holidays):
-            pass
-        else:
-            dates.append(date_)
-            delta -= i
-    return sorted(dates)
+    dates = list(iter_dates(date, delta, skip_weekend, holidays))
+    return dates if delta >= 0 else dates[::-1]
+
+
+def iter_dates(start: dt.date,
+               end_or_delta: Union[dt.date, int],
+               skip_weekend: bool = False,
+               holidays: Optional[Collection[dt.date]] = None,
+               step: str = 'day'
+               ) -> Iterator[dt.date]:
+    """Lazily iterate dates from start, in the direction of travel.
+    With an int delta, yields the dates of get_dates: start, then delta
+    valid dates before or after it. With an end date, yields the valid
+    dates from start to end inclusive.
+    With step 'week' or 'month', yields start plus k weeks or months, each
+    rolled to the next valid date in the direction of travel; an int delta
+    then counts steps.
+    """
+    holidays_ = set(holidays) if holidays else set()
+    if isinstance(end_or_delta, dt.date):
+        end, n = end_or_delta, None
+        sign = -1 if end_or_delta < start else 1
+    else:  # int-like delta, e.g. np.int64 taken from a DataFrame
+        end, n = None, abs(int(end_or_delta))
+        sign = -1 if end_or_delta < 0 else 1
+
+    def valid(d: dt.date) -> bool:
+        return (not skip_weekend or is_weekday(d)) and d not in holidays_
+
+    def in_range(d: dt.date) -> bool:
+        return end is None or (d <= end if sign > 0 else d >= end)
+
+    if step == 'day':
+        if end is None or valid(start):
+            yield start
+        date = start
+        for _ in itertools.repeat(None) if n is None else range(n):
+            date = next_valid(date, sign, skip_weekend, holidays_)
+            if not in_range(date):
+                return
+            yield date
+    elif step in ('week', 'month'):
+        for k in itertools.count() if n is None else range(n + 1):
+            anchor = (add_months(start, sign * k) if step == 'month' else
+                      start + dt.timedelta(weeks=sign * k))
+            date = (anchor if valid(anchor) else
+                    next_valid(anchor, sign, skip_weekend, holidays_))
+            if not in_range(date):
+                return
+            yield date
+    else:
+        raise ValueError(f'iter_dates step must be day, week or month: {step}')
+
+
+def next_valid(date: dt.date,
+               sign: int,
+               skip_weekend: bool,
+               holidays: Set[dt.date]
+               ) -> dt.date:
+    """Return the next valid date after (sign 1) or before (sign -1) date.
+    Weekends are jumped over directly rather than tested day by day.
+    """
+    while True:
+        days = 1
+        if skip_weekend:
+            wd = date.weekday()
+            days = ({4: 3, 5: 2} if sign > 0 else {0: 3, 6: 2}).get(wd, 1)
+        date += dt.timedelta(days=sign * days)
+        if date not in holidays:
+            return date
+
+
+def add_months(date: dt.date, months: int) -> dt.date:
+    """Add months to date, clamping the day to the end of the month."""
+    y, m = divmod(date.month - 1 + months, 12)
+    year, month = date.year + y, m + 1
+    return date.replace(year=year, month=month,
+                        day=min(date.day, calendar.monthrange(year, month)[1]))
+
+
+##########################################################################
+# Date Array Deltas
+
+# any array-like of dates convertible to datetime64[D]
+DateArray = Any
+
+
+def get_biz_date_array(dates: DateArray,
+                       delta: Union[int, DateArray],
+                       holidays: Optional[Collection[dt.date]] = None
+                       ) -> np.ndarray:
+    """Get business dates with specified time delta for an array of dates."""
+    return get_date_array(dates, delta, True, holidays)
+
+
+def get_date_array(dates: DateArray,
+                   delta: Union[int, DateArray],
+                   skip_weekend: bool = False,
+                   holidays: Optional[Collection[dt.date]] = None
+                   ) -> np.ndarray:
+    """Get dates with specified time delta for an array of dates.
+    Vectorized get_date: delta is a scalar or an array of the same length,
+    and the result is a datetime64[D] array (NaT stays NaT).
+    """
+    dates_ = np.asarray(dates).astype('datetime64[D]')
+    delta_ = np.asarray(delta, dtype=np.int64)
+    cal = busday_calendar(skip_weekend, holidays)
+
+    # invalid start dates roll away from the direction of travel,
+    # so the first step lands on the next valid date as in get_date
+    fwd = np.busday_offset(dates_, np.maximum(delta_, 0), roll='backward',
+                           busdaycal=cal)
+    bwd = np.busday_offset(dates_, np.minimum(delta_, 0), roll='forward',
+                           busdaycal=cal)
+    return np.where(delta_ > 0, fwd, np.where(delta_ < 0, bwd, dates_))
+
+
+def busday_calendar(skip_weekend: bool = False,
+                    holidays: Optional[Collection[dt.date]] = None
+                    ) -> np.busdaycalendar:
+    """Return numpy business day calendar for weekend and holiday rules."""
+    return np.busdaycalendar(
+        weekmask='1111100' if skip_weekend else '1111111',
+        holidays=np.array(sorted(holidays) if holidays else [],
+                          dtype='datetime64[D]'))
+
+
+##########################################################################
+# Business Calendar
+
+CALENDAR_START = dt.date(1970, 1, 1)
+CALENDAR_END = dt.date(2099, 12, 31)
+
+
+class BusinessCalendar:
+    """Business days between start and end, precomputed as a cumulative
+    index so offsets and counts are O(1) lookups.
+    Index arrays are memoized per (holidays, start, end, skip_weekend), so
+    repeated construction is free. Dates outside the range fall back to the
+    scalar functions with a warning.
+    """
+
+    def __init__(self,
+                 holidays: Optional[Collection[dt.date]] = None,
+                 start: dt.date = CALENDAR_START,
+                 end: dt.date = CALENDAR_END,
+                 skip_weekend: bool = True):
+        self.holidays = frozenset(holidays) if holidays else frozenset()
+        self.start, self.end = start, end
+        self.skip_weekend = skip_weekend
+        self.valid, self.cum, self.biz = calendar_index(
+            self.holidays, start, end, skip_weekend)
+
+    def in_range(self, *dates: dt.date) -> bool:
+        """Return True if all dates are within the calendar range."""
+        return all(self.start <= d <= self.end for d in dates)
+
+    def is_business_day(self, date: dt.date) -> bool:
+        """Return True if date is a business day."""
+        if not self.in_range(date):
+            logger.warning(f'BusinessCalendar: {date} out of range')
+            return ((not self.skip_weekend or is_weekday(date)) and
+                    date not in self.holidays)
+        return bool(self.valid[(date - self.start).days])
+
+    def offset(self, date: dt.date, n: int) -> dt.date:
+        """Get business date n business days from date, as get_date."""
+        if n == 0:
+            return date
+
+        i = (date - self.start).days
+        if self.in_range(date):
+            # business days up to and including date, or strictly before it
+            k = (self.cum[i + 1] - 1 + n if n > 0 else
+                 self.cum[i] + n)
+            if 0 <= k < len(self.biz):
+                return self.biz[k].astype(dt.date)
+
+        logger.warning(f'BusinessCalendar: offset {n} from {date} ' +
+                       'out of range')
+        return get_date(date, n, self.skip_weekend, self.holidays)
+
+    def count_between(self, d1: dt.date, d2: dt.date) -> int:
+        """Count business days in [d1, d2), or the negated count in
+        (d2, d1] if d2 < d1, as numpy.busday_count.
+        """
+        if not self.in_range(d1, d2):
+            logger.warning(f'BusinessCalendar: {d1} to {d2} out of range')
+            return (len(self.dates(d1, d2)) - self.is_business_day(d2)
+                    if d1 <= d2 else
+                    self.is_business_day(d2) - len(self.dates(d2, d1)))
+
+        i, j = (d1 - self.start).days, (d2 - self.start).days
+        return (int(self.cum[j] - self.cum[i]) if d1 <= d2 else
+                int(self.cum[j + 1] - self.cum[i + 1]))
+
+    def dates(self, d1: dt.date, d2: dt.date) -> List[dt.date]:
+        """Get business days in [d1, d2]."""
+        if not self.in_range(d1, d2):
+            logger.warning(f'BusinessCalendar: {d1} to {d2} out of range')
+            if d2 < d1:
+                return []
+            return [d for d in get_dates(d1, (d2 - d1).days)
+                    if (not self.skip_weekend or is_weekday(d)) and
+                    d not in self.holidays]
+
+        i, j = (d1 - self.start).days, (d2 - self.start).days
+        return self.biz[self.cum[i]:self.cum[j + 1]].tolist()
+
+
+@lru_cache(maxsize=32)
+def calendar_index(holidays: FrozenSet[dt.date],
+                   start: dt.date,
+                   end: dt.date,
+                   skip_weekend: bool
+                   ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (valid mask, cumulative count, business days) arrays.
+    cum[i] is the number of business days before start + i days.
+    """
+    days = np.arange(np.datetime64(start, 'D'),
+                     np.datetime64(end, 'D') + 1)
+    valid = np.is_busday(days,
+                         busdaycal=busday_calendar(skip_weekend, holidays))
+    cum = np.concatenate([[0], np.cumsum(valid)])
+    biz = days[valid]
+    for a in (valid, cum, biz):
+        a.flags.writeable = False
+    return valid, cum, biz
 
 
 ##########################################################################
 # Date Parsing
 
+# (pattern, order of day / month / year groups), tried in order
+DATE_NAME_PATTERNS: List[Tuple[Pattern, str]] = [
+    (re.compile(r'([0-9]{1,2})[\s,/]+([a-z]+)[\s,/]+([0-9]{4})',
+                re.IGNORECASE), 'dmy'),
+    (re.compile(r'([a-z]+)[\s,/]+([0-9]+)[\s,/]+([0-9]+)',
+                re.IGNORECASE), 'mdy'),
+    (re.compile(r'([0-9]{4})[\s,/]+([a-z]+)[\s,/]+([0-9]{1,2})',
+                re.IGNORECASE), 'ymd')]
+
+# number of unique strings sampled to infer a single date name format
+INFER_SAMPLE = 100
+
+
+@lru_cache(maxsize=10000)
 def parse_date_name(date: str) -> Optional[dt.date]:
     """Parse date where month is a name."""
-    p1 = r'([0-9]{1,2})[\s,/]+([a-z]+)[\s,/]+([0-9]{4})'
-    p2 = r'([a-z]+)[\s,/]+([0-9]+)[\s,/]+([0-9]+)'
-    p3 = r'([0-9]{4})[\s,/]+([a-z]+)[\s,/]+([0-9]{1,2})'
-
-    mp1 = re.findall(p1, date, re.IGNORECASE)
-    mp2 = re.findall(p2, date, re.IGNORECASE)
-    mp3 = re.findall(p3, date, re.IGNORECASE)
-
-    if mp1 and len(mp1[0]) == 3:
-        d, m, y = mp1[0]
-    elif mp2 and len(mp2[0]) == 3:
-        m, d, y = mp2[0]
-    elif mp3 and len(mp3[0]) == 3:
-        y, m, d = mp3[0]
+    for pattern, order in DATE_NAME_PATTERNS:
+        match = pattern.search(date)
+        if match:
+            return match_to_date(match, order)
+    return None
+
+
+def parse_date_names(values: Iterable[str],
+                     infer: bool = False,
+                     sample_size: int = INFER_SAMPLE
+                     ) -> Union[List[Optional[dt.date]], pd.Series]:
+    """Parse dates where month is a name for a list or Series of strings.
+    Each unique string is parsed once and results are broadcast back; a
+    Series input returns a Series with the same index. Missing or non-str
+    values parse to None.
+    If infer, the pattern matching most of a sample of unique strings is
+    applied to all of them, and strings not in that format parse to None.
+    """
+    codes, uniq = pd.factorize(np.asarray(values, dtype=object))
+    strs = [u if isinstance(u, str) else '' for u in uniq]
+
+    if infer:
+        pattern, order = infer_date_name_pattern(strs[:sample_size])
+        matches = (pattern.search(s) for s in strs)
+        parsed = [match_to_date(m, order) if m else None for m in matches]
     else:
-        y, m, d = 0, None, 0
+        parsed = [parse_date_name(s) for s in strs]
 
-    return maybe_date(int(y), month_to_int(m) if m else None, int(d))
+    dates = np.array(parsed + [None], dtype=object)[codes]
+    if isinstance(values, pd.Series):
+        return pd.Series(dates, index=values.index, name=values.name,
+                         dtype=object)
+    return dates.tolist()
+
+
+def infer_date_name_pattern(sample: List[str]) -> Tuple[Pattern, str]:
+    """Return the date name pattern that first matches most of sample."""
+    counts = [0] * len(DATE_NAME_PATTERNS)
+    for s in sample:
+        i = next((i for i, (p, _) in enumerate(DATE_NAME_PATTERNS)
+                  if p.search(s)), None)
+        if i is not None:
+            counts[i] += 1
+    return DATE_NAME_PATTERNS[counts.index(max(counts))]
+
+
+def match_to_date(match: re.Match, order: str) -> Optional[dt.date]:
+    """Convert date name match with groups in order (e.g. 'dmy') to date."""
+    parts = dict(zip(order, match.groups()))
+    return maybe_date(int(parts['y']), month_to_int(parts['m']),
+                      int(parts['d']))
 
 
 def maybe_date(my: Optional[int],
@@ -85,10 +365,13 @@ def maybe_date(my: Optional[int],
                md: Optional[int]
                ) -> Optional[dt.date]:
     """Return a date if int args for year, month, date are valid."""
-    return (dt.date(my, mm, md) if my and my in range(0, 3000) and
-            mm and mm in range(1, 13) and
-            md and md in range(1, 32) else
-            None)
+    try:
+        return (dt.date(my, mm, md) if my and my in range(0, 3000) and
+                mm and mm in range(1, 13) and
+                md and md in range(1, 32) else
+                None)
+    except ValueError:
+        return None  # e.g. day out of range for month
 
 ##########################################################################
 # Helpers
@@ -99,19 +382,14 @@ def is_weekday(date: dt.date) -> bool:
     return dt.date.weekday(date) <= 4
 
 
+MONTHS: Dict[str, int] = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6,
+    'jul': 7, 'july': 7, 'aug': 8, 'august': 8,
+    'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11, 'dec': 12, 'december': 12}
+
+
 def month_to_int(month: str) -> Optional[int]:
     """Attempt to parse month from word to int."""
-    m = month.lower().strip()
-    return (1 if m in ('jan', 'january') else
-            2 if m in ('feb', 'february') else
-            3 if m in ('mar', 'march') else
-            4 if m in ('apr', 'april') else
-            5 if m in ('may',) else
-            6 if m in ('jun', 'june') else
-            7 if m in ('jul', 'july') else
-            8 if m in ('aug', 'august') else
-            9 if m in ('sep', 'sept', 'september') else
-            10 if m in ('oct', 'october') else
-            11 if m in ('nov', 'november') else
-            12 if m in ('dec', 'december') else
-            None)
+    return MONTHS.get(month.lower().strip())
@@ -1,15 +1,33 @@
 """Helper for setting up module-specific logging.
+File handlers either write synchronously (default) or are owned by one
+shared QueueListener thread, so the caller only pays for a queue put.
 """
 
+import atexit  # type: ignore
 import logging  # type: ignore
-from logging.handlers import RotatingFileHandler  # type: ignore
+from logging.handlers import (QueueHandler, QueueListener,
+                              RotatingFileHandler)  # type: ignore
+from os import environ  # type: ignore
 from os.path import expanduser  # type: ignore
-from typing import Optional  # type: ignore
+import queue  # type: ignore
+import threading  # type: ignore
+import time  # type: ignore
+from typing import Dict, Optional, Sequence, Tuple  # type: ignore
 
 ##########################################################################
 
 DEFAULTPATH = '~/logs/'
 
+# queued mode for all loggers can be enabled with DATAUTILS_LOG_QUEUE=1
+QUEUED = environ.get('DATAUTILS_LOG_QUEUE', '') == '1'
+QUEUE_SIZE = 10000
+
+DROP_NEW = 'drop_new'
+DROP_OLD = 'drop_old'
+
+# max rate limit buckets kept per filter; the oldest is evicted when full
+MAX_BUCKETS = 1000
+
 ##########################################################################
 
 
@@ -17,16 +35,218 @@ def init_file_log(fname: str,
                   level: int = logging.INFO,
                   fmt: Optional[logging.Formatter] = None,
                   fpath: str = DEFAULTPATH,
+                  queued: Optional[bool] = None,
+                  rate_limit: Optional[float] = None,
+                  rate_limit_prefixes: Optional[Sequence[str]] = None,
+                  drop_policy: Optional[str] = None
                   ) -> logging.Logger:
-    """Initialize and return a file logger."""
+    """Initialize and return a file logger.
+    If queued (default QUEUED), records go through a bounded queue to the
+    shared listener thread that owns the file handler; when the queue is
+    full, drop_policy (DROP_NEW or DROP_OLD, default DROP_NEW) applies.
+    If rate_limit is given, at most that many records per second are kept
+    per logging call site, optionally only for messages starting with one
+    of rate_limit_prefixes. Errors are never limited.
+    """
     logger = logging.getLogger(fname)
     logger.setLevel(level)
 
+    # delay: log file is only opened on first emitted record
     f = expanduser('{}{}.log'.format(fpath, fname))
-    fh = RotatingFileHandler(f, maxBytes=10000000, backupCount=10)
+    fh = RotatingFileHandler(f, maxBytes=10000000, backupCount=10,
+                             delay=True)
     default_fmt = logging.Formatter(
         '%(asctime)s - %(levelname)s - {} - %(message)s'.format(fname))
     fh.setFormatter(default_fmt if fmt is None else fmt)
-    logger.addHandler(fh)
 
+    handler: logging.Handler = fh
+    if QUEUED if queued is None else queued:
+        handler = DroppingQueueHandler(get_listener().register(fname, fh),
+                                       drop_policy)
+
+    if rate_limit is not None:
+        handler.addFilter(RateLimitFilter(rate_limit, rate_limit_prefixes))
+
+    logger.addHandler(handler)
     return logger
+
+
+##########################################################################
+# Queued Logging
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the bounded queue is full.
+    Policy DROP_NEW discards the incoming record, DROP_OLD discards the
+    oldest queued record to make room.
+    """
+
+    def __init__(self, route: 'RoutedQueue', policy: Optional[str] = None):
+        super().__init__(route.queue)
+        self.route = route
+        self.policy = route.policy if policy is None else policy
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Tag record with its route so the listener finds the handler."""
+        record = super().prepare(record)
+        record.route = self.route.name  # type: ignore
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        """Put record without blocking, applying drop policy if full."""
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        if self.policy == DROP_OLD:
+            try:
+                self.route.queue.get_nowait()
+                self.route.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+        self.route.dropped += 1
+
+
+class RoutedQueue:
+    """Named route from a QueueHandler to a file handler."""
+
+    def __init__(self, name: str, q: queue.Queue, policy: str):
+        self.name = name
+        self.queue = q
+        self.policy = policy
+        self.dropped = 0
+
+
+class RoutingHandler(logging.Handler):
+    """Dispatch dequeued records to the file handler of their route."""
+
+    def __init__(self):
+        super().__init__()
+        self.handlers: Dict[str, logging.Handler] = {}
+
+    def emit(self, record: logging.LogRecord):
+        h = self.handlers.get(getattr(record, 'route', record.name))
+        if h is not None and record.levelno >= h.level:
+            h.handle(record)
+
+    def close(self):
+        for h in self.handlers.values():
+            h.close()
+        super().close()
+
+
+class FlushingQueueListener(QueueListener):
+    """QueueListener whose stop sentinel waits for room in a full queue."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class SharedListener:
+    """Single QueueListener thread owning all queued file handlers."""
+
+    def __init__(self, maxsize: int = QUEUE_SIZE, policy: str = DROP_NEW):
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.policy = policy
+        self.router = RoutingHandler()
+        self.routes: Dict[str, RoutedQueue] = {}
+        self.listener: Optional[FlushingQueueListener] = None
+        self.lock = threading.Lock()
+
+    def register(self, name: str, handler: logging.Handler) -> RoutedQueue:
+        """Register handler for route name and start listener if needed.
+        Re-registering a name replaces its handler.
+        """
+        with self.lock:
+            old = self.router.handlers.get(name)
+            if old is not None and old is not handler:
+                old.close()
+            self.router.handlers[name] = handler
+            if name not in self.routes:
+                self.routes[name] = RoutedQueue(name, self.queue, self.policy)
+            if self.listener is None:
+                self.listener = FlushingQueueListener(self.queue,
+                                                      self.router)
+                self.listener.start()
+            return self.routes[name]
+
+    def dropped(self) -> Dict[str, int]:
+        """Return count of dropped records per route."""
+        return {name: r.dropped for name, r in self.routes.items()}
+
+    def stop(self):
+        """Flush queued records and stop the listener thread."""
+        with self.lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+
+_listener: Optional[SharedListener] = None
+_listener_lock = threading.Lock()
+
+
+def get_listener() -> SharedListener:
+    """Return the shared listener, creating it on first use."""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = SharedListener()
+            atexit.register(stop_listener)
+        return _listener
+
+
+def stop_listener():
+    """Flush and stop the shared listener; restarted on next register."""
+    if _listener is not None:
+        _listener.stop()
+
+
+##########################################################################
+# Rate Limiting
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket rate limit per (logger, call site).
+    Messages are formatted before logging, so buckets are keyed on the
+    source line rather than the text. Allows bursts of up to rate records
+    (at least one), refilled at rate per second; at most max_buckets are
+    kept.
+    Records at ERROR or above always pass.
+    """
+
+    def __init__(self,
+                 rate: float,
+                 prefixes: Optional[Sequence[str]] = None,
+                 max_buckets: int = MAX_BUCKETS
+                 ):
+        super().__init__()
+        self.rate = rate
+        self.prefixes = tuple(prefixes) if prefixes else None
+        self.max_buckets = max_buckets
+        self.buckets: Dict[Tuple[str, str, int], Tuple[float, float]] = {}
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+
+        msg = str(record.msg)
+        if self.prefixes is not None and not msg.startswith(self.prefixes):
+            return True
+
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        if key not in self.buckets and len(self.buckets) >= self.max_buckets:
+            del self.buckets[next(iter(self.buckets))]
+        burst = max(1.0, self.rate)
+        tokens, last = self.buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now)
+            self.suppressed += 1
+            return False
+        self.buckets[key] = (tokens - 1, now)
+        return True
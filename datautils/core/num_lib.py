@@ -1,11 +1,23 @@
 """Numerical functions.
 """
 
+from __future__ import annotations
+
 import logging  # type: ignore
-import numpy as np  # type: ignore
-from typing import Collection, List, Optional, TypeVar  # type: ignore
+import math  # type: ignore
+from typing import (TYPE_CHECKING, Any, Callable, Collection, Dict, Iterable,
+                    Iterator, List, Optional, Tuple, TypedDict, TypeVar,
+                    Union)  # type: ignore
 
 from datautils.core import log_setup  # type: ignore
+from datautils.core.utils import lazy_import  # type: ignore
+
+if TYPE_CHECKING:
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+else:
+    np = lazy_import('numpy')
+    pd = lazy_import('pandas')
 
 ##########################################################################
 # Initialize Logging -- set logging level to > 50 to suppress all output
@@ -22,12 +34,100 @@ def approx_eq(f1: float,
               epsilon_abs: Optional[float] = None
               ) -> bool:
     """Approximate equality for floats.
-    Use epsilon_abs as absolute value if given; else use epsilon as proportion.
+    Use epsilon_abs as absolute value if given; else use epsilon as proportion
+    of the smaller magnitude.
     """
-    diff = abs(epsilon_abs) if epsilon_abs else abs(epsilon * min(f1, f2))
+    diff = (abs(epsilon_abs) if epsilon_abs else
+            abs(epsilon * min(abs(f1), abs(f2))))
     return abs(f2 - f1) <= diff
 
 
+# (position, a, b, abs diff); position is an index label, (index, col)
+# label pair, or array index
+Deviation = Tuple[Any, float, float, float]
+
+
+class Deviations(TypedDict):
+    count: int
+    unequal: int
+    max_abs: float
+    max_rel: float
+    largest: List[Deviation]
+
+
+def approx_eq_array(a: Union[np.ndarray, pd.Series, pd.DataFrame],
+                    b: Union[np.ndarray, pd.Series, pd.DataFrame],
+                    epsilon: float = 0.0001,
+                    epsilon_abs: Optional[float] = None,
+                    top: int = 10
+                    ) -> Tuple[Union[np.ndarray, pd.Series, pd.DataFrame],
+                               Deviations]:
+    """Elementwise approx_eq for arrays, Series or DataFrames of equal shape.
+    Pandas inputs are compared positionally and return a mask with the
+    index and cols of a. Missing on both sides counts as equal.
+    Also returns a summary of deviations with the top largest unequal.
+    """
+    x, y = to_float_array(a), to_float_array(b)
+    if x.shape != y.shape:
+        raise ValueError(f'Shape mismatch: {x.shape} vs {y.shape}')
+
+    mask = approx_eq_mask(x, y, epsilon, epsilon_abs)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff = np.abs(y - x)
+        rel = diff / np.minimum(np.abs(x), np.abs(y))
+    unequal = np.flatnonzero(~mask)
+
+    # unequal values missing on one side rank as largest
+    ranked = np.where(np.isnan(diff.ravel()[unequal]), np.inf,
+                      diff.ravel()[unequal])
+    n = min(top, len(unequal))
+    idx = unequal[np.argsort(-ranked, kind='stable')[:n]]
+    largest = [(position_label(a, i, x.shape), float(x.flat[i]),
+                float(y.flat[i]), float(diff.flat[i])) for i in idx]
+
+    summary: Deviations = {
+        'count': int(x.size),
+        'unequal': int(len(unequal)),
+        'max_abs': float(np.nanmax(diff)) if np.isfinite(diff).any() else 0.0,
+        'max_rel': float(np.nanmax(rel)) if (~np.isnan(rel)).any() else 0.0,
+        'largest': largest}
+
+    if hasattr(a, 'iloc'):
+        mask = (pd.Series(mask, index=a.index, name=a.name)  # type: ignore
+                if x.ndim == 1 else
+                pd.DataFrame(mask, index=a.index,  # type: ignore
+                             columns=a.columns))  # type: ignore
+    return mask, summary
+
+
+def approx_eq_mask(x: np.ndarray,
+                   y: np.ndarray,
+                   epsilon: float = 0.0001,
+                   epsilon_abs: Optional[float] = None
+                   ) -> np.ndarray:
+    """Elementwise approx_eq of float arrays, with NaN == NaN."""
+    with np.errstate(invalid='ignore'):
+        tol = (abs(epsilon_abs) if epsilon_abs else
+               abs(epsilon) * np.minimum(np.abs(x), np.abs(y)))
+        return (x == y) | (np.abs(y - x) <= tol) | (np.isnan(x) & np.isnan(y))
+
+
+def to_float_array(xs: Any) -> np.ndarray:
+    """Convert array-like or pandas object to float ndarray, NA as NaN."""
+    if hasattr(xs, 'iloc'):
+        return xs.to_numpy(dtype=float, na_value=np.nan)
+    return np.asarray(xs, dtype=float)
+
+
+def position_label(xs: Any, i: int, shape: Tuple[int, ...]) -> Any:
+    """Label of flat position i: index label, (index, col) or array index."""
+    pos = np.unravel_index(i, shape)
+    if hasattr(xs, 'iloc'):
+        return (xs.index[pos[0]] if len(pos) == 1 else
+                (xs.index[pos[0]], xs.columns[pos[1]]))
+    return int(pos[0]) if len(pos) == 1 else tuple(int(p) for p in pos)
+
+
 ##########################################################################
 # Statistics
 
@@ -35,14 +135,99 @@ T = TypeVar('T', int, float)
 Percentile = float
 
 
-def windsorize(xs: Collection[T],
+Windsorizable = Union[Collection[T], 'np.ndarray', 'pd.Series',
+                      'pd.DataFrame']
+
+
+def windsorize(xs: Windsorizable,
                lower: Percentile,
-               upper: Percentile
-               ) -> List:
+               upper: Percentile,
+               axis: int = 0
+               ) -> Union[List, np.ndarray, pd.Series, pd.DataFrame]:
     """Windsorize given collection.
     Percentiles are defined in range [0.0, 100.0].
     Values are bound by the lower and upper percentile args.
+    ndarrays, Series and DataFrames keep their type (and index); bounds are
+    taken along axis, so per col of a DataFrame by default. Other
+    collections return a List. Missing values are ignored and kept.
+    """
+    check_percentiles(lower, upper)
+    if hasattr(xs, 'iloc'):
+        return windsorize_pandas(xs, lower, upper, axis)
+
+    arr = xs if isinstance(xs, np.ndarray) else np.asarray(list(xs))
+    lo, up = np.nanpercentile(arr, [lower, upper], axis=axis,
+                              method='nearest', keepdims=True)
+    clipped = np.clip(arr, lo, up)
+    return clipped if arr is xs else clipped.tolist()
+
+
+def windsorize_pandas(xs: Union[pd.Series, pd.DataFrame],
+                      lower: Percentile,
+                      upper: Percentile,
+                      axis: int = 0
+                      ) -> Union[pd.Series, pd.DataFrame]:
+    """Windsorize Series, or DataFrame cols (axis 0) or rows (axis 1)."""
+    vals = xs.to_numpy(dtype=float, na_value=np.nan)
+    lo, up = np.nanpercentile(vals, [lower, upper], axis=axis,
+                              method='nearest')
+    if xs.ndim == 1:
+        return xs.clip(lo, up)
+
+    labels = xs.columns if axis == 0 else xs.index
+    return xs.clip(pd.Series(lo, index=labels), pd.Series(up, index=labels),
+                   axis=1 - axis)
+
+
+def windsorize_by(df: pd.DataFrame,
+                  group_cols: List[str],
+                  value_cols: List[str],
+                  lower: Percentile,
+                  upper: Percentile
+                  ) -> pd.DataFrame:
+    """Windsorize value cols within groups of group_cols, as windsorize.
+    Each value col is sorted once by (group, value) and both bounds of all
+    groups are read from the sorted positions. Returns a copy of df.
     """
+    check_percentiles(lower, upper)
+    codes = df.groupby(group_cols, sort=False, dropna=False).ngroup()
+    codes = codes.to_numpy()
+    sizes = np.bincount(codes)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    df = df.copy()
+    for col in value_cols:
+        vals = df[col].to_numpy(float)
+        valid = ~np.isnan(vals)
+        n = np.bincount(codes[valid], minlength=len(sizes))
+        lo, up = group_percentiles(vals, codes, starts, n, [lower, upper])
+        df[col] = df[col].clip(lo[codes], up[codes])
+    return df
+
+
+def group_percentiles(vals: np.ndarray,
+                      codes: np.ndarray,
+                      starts: np.ndarray,
+                      n: np.ndarray,
+                      percentiles: List[Percentile]
+                      ) -> List[np.ndarray]:
+    """Nearest-method percentiles of vals per group code.
+    starts are the group offsets in (code, value) order and n the counts of
+    non-missing values; NaN sorts last so does not affect the result.
+    """
+    order = np.lexsort((vals, codes))
+    sorted_vals = vals[order]
+    empty = n == 0
+    bounds = []
+    for p in percentiles:
+        # index rule of np.percentile(..., method='nearest')
+        k = np.around((np.maximum(n, 1) - 1) * (p / 100)).astype(np.intp)
+        bounds.append(np.where(empty, np.nan, sorted_vals[starts + k]))
+    return bounds
+
+
+def check_percentiles(lower: Percentile, upper: Percentile):
+    """Log warnings for likely mistakes in windsorize percentiles."""
     if not approx_eq(lower, 100 - upper):
         logger.warning('Asymmetric bounds {} and {}'.format(lower, upper))
     # warn misinterpretation of percentile range
@@ -50,8 +235,290 @@ def windsorize(xs: Collection[T],
         msg = 'Percentiles defined in range [0.0, 100.0], got {}, {}'
         logger.warning(msg.format(lower, upper))
 
-    low_val = np.percentile(list(xs), lower, method='nearest')
-    up_val = np.percentile(list(xs), upper, method='nearest')
 
-    return [low_val if x < low_val else up_val if x > up_val else x
-            for x in xs]
+##########################################################################
+# Streaming Statistics
+
+# KLL compactor size of the top level; rank error is roughly 2 / k
+SKETCH_K = 1000
+
+
+class QuantileSketch:
+    """Mergeable KLL-style quantile sketch for streams of numeric chunks.
+    Level h holds items of weight 2 ** h. When a level exceeds its capacity
+    (shrinking by 2/3 per level below the top), it is sorted and every
+    other item, from a random offset, is promoted to the next level.
+    Memory is O(k) items; min and max are exact. Missing values are ignored.
+    """
+
+    def __init__(self, k: int = SKETCH_K, seed: Optional[int] = None):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, xs: Windsorizable) -> QuantileSketch:
+        """Add a chunk of values to the sketch."""
+        vals = to_float_array(xs if hasattr(xs, 'iloc') or
+                              isinstance(xs, np.ndarray) else list(xs))
+        vals = vals[~np.isnan(vals)].ravel()
+        if len(vals):
+            self.n += len(vals)
+            self.min = min(self.min, float(vals.min()))
+            self.max = max(self.max, float(vals.max()))
+            self.levels[0] = np.concatenate([self.levels[0], vals])
+            self.compress()
+        return self
+
+    def merge(self, other: QuantileSketch) -> QuantileSketch:
+        """Merge other sketch (e.g. of another partition) into this one."""
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.compress()
+        return self
+
+    def capacity(self, h: int) -> int:
+        depth = len(self.levels) - 1 - h
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def compress(self):
+        """Compact levels over capacity, promoting half their items."""
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self.capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                m = len(items) - len(items) % 2
+                promoted = items[self.rng.integers(2):m:2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1],
+                                                     promoted])
+                self.levels[h] = items[m:]
+            h += 1
+
+    def percentile(self, ps: Union[Percentile, List[Percentile]]
+                   ) -> Union[float, np.ndarray]:
+        """Approximate percentiles in range [0.0, 100.0].
+        Uses the nearest rank rule of np.percentile, so results are exact
+        until the first compaction.
+        """
+        items = np.concatenate(self.levels)
+        if not len(items):
+            return np.full(np.shape(ps), np.nan)[()]
+        weights = np.concatenate([np.full(len(items_), 2 ** h)
+                                  for h, items_ in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cum = items[order], np.cumsum(weights[order])
+
+        qs = np.asarray(ps, dtype=float) / 100
+        idx = np.searchsorted(cum, np.around((cum[-1] - 1) * qs),
+                              side='right')
+        vals = items[np.minimum(idx, len(items) - 1)]
+        vals = np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, vals))
+        return vals[()]
+
+
+def windsorize_chunks(chunks: Callable[[], Iterable[Windsorizable]],
+                      lower: Percentile,
+                      upper: Percentile,
+                      sketch: Optional[Union[QuantileSketch,
+                                             List[QuantileSketch]]] = None
+                      ) -> Iterator[Union[List, np.ndarray, pd.Series,
+                                          pd.DataFrame]]:
+    """Approximately windsorize a stream too large to hold in memory.
+    chunks returns a fresh iterable of chunks on each call: pass 1 builds a
+    QuantileSketch (unless a prebuilt, e.g. merged, sketch is given) and
+    pass 2 yields each chunk clipped to the approximate percentiles.
+    As in windsorize, DataFrame and 2-D chunks are bound per col, with one
+    sketch per col (a prebuilt sketch is then a list of them).
+    ndarray, Series and DataFrame chunks keep their type; others become
+    Lists.
+    """
+    check_percentiles(lower, upper)
+    sketches = [sketch] if isinstance(sketch, QuantileSketch) else sketch
+    if sketches is None:
+        sketches = []
+        for chunk in chunks():
+            cols = chunk_cols(chunk)
+            if not sketches:
+                sketches = [QuantileSketch() for _ in cols]
+            for s, col in zip(sketches, cols):
+                s.update(col)
+
+    if not sketches:
+        return
+
+    # bounds are stored values, so casting back to int dtypes is exact
+    bounds = np.array([s.percentile([lower, upper]) for s in sketches])
+    lo, up = bounds[:, 0], bounds[:, 1]
+    for chunk in chunks():
+        if isinstance(chunk, pd.DataFrame):
+            yield chunk.clip(lo, up, axis=1).astype(chunk.dtypes)
+        elif isinstance(chunk, pd.Series):
+            yield chunk.clip(lo[0], up[0]).astype(chunk.dtype)
+        else:
+            arr = (chunk if isinstance(chunk, np.ndarray) else
+                   np.asarray(list(chunk)))
+            clipped = np.clip(arr, lo, up).astype(arr.dtype, copy=False)
+            yield clipped if arr is chunk else clipped.tolist()
+
+
+def chunk_cols(chunk: Windsorizable) -> List[Any]:
+    """Split a chunk into its cols: one for 1-D, one per col for 2-D."""
+    if isinstance(chunk, pd.DataFrame):
+        return [chunk.iloc[:, j] for j in range(chunk.shape[1])]
+    if isinstance(chunk, pd.Series):
+        return [chunk]
+    arr = chunk if isinstance(chunk, np.ndarray) else np.asarray(list(chunk))
+    return list(arr.T) if arr.ndim == 2 else [arr]
+
+
+class OnlineStats:
+    """Running count, mean, variance, min and max over streamed chunks.
+    Each chunk is summarized exactly (two-pass within the chunk) and
+    combined with Chan's parallel update, so accumulators from worker
+    processes can be merged. Missing values are ignored.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, xs: Windsorizable) -> OnlineStats:
+        """Add a chunk of values."""
+        vals = to_float_array(xs if hasattr(xs, 'iloc') or
+                              isinstance(xs, np.ndarray) else list(xs))
+        vals = vals[~np.isnan(vals)].ravel()
+        if len(vals):
+            mean = float(vals.mean())
+            m2 = float(((vals - mean) ** 2).sum())
+            self.n, self.mean, self.m2 = chan_merge(
+                self.n, self.mean, self.m2, len(vals), mean, m2)
+            self.min = min(self.min, float(vals.min()))
+            self.max = max(self.max, float(vals.max()))
+        return self
+
+    def merge(self, other: OnlineStats) -> OnlineStats:
+        """Merge other accumulator (e.g. of another partition) into this."""
+        if other.n:
+            self.n, self.mean, self.m2 = chan_merge(
+                self.n, self.mean, self.m2, other.n, other.mean, other.m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        return self
+
+    def variance(self, ddof: int = 1) -> float:
+        """Variance, sample (ddof 1) by default; NaN if too few values."""
+        return self.m2 / (self.n - ddof) if self.n > ddof else math.nan
+
+    def std(self, ddof: int = 1) -> float:
+        """Standard deviation, sample (ddof 1) by default."""
+        return math.sqrt(self.variance(ddof))
+
+
+class GroupedStats:
+    """OnlineStats per group, with groups keyed by the values of a col.
+    Missing keys form their own group.
+    Each chunk is reduced per group with np.bincount, so updates are
+    vectorized over groups; only new group keys are looked up in Python.
+    """
+
+    def __init__(self):
+        self.groups: Dict[Any, int] = {}
+        self.n = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+
+    def update(self, keys: Any, xs: Any) -> GroupedStats:
+        """Add a chunk of values with their group keys (arrays or Series)."""
+        vals = to_float_array(xs)
+        valid = ~np.isnan(vals)
+        codes, uniq = pd.factorize(np.asarray(keys, dtype=object)[valid],
+                                   use_na_sentinel=False)
+        vals = vals[valid]
+
+        k = len(uniq)
+        n = np.bincount(codes, minlength=k)
+        mean = np.bincount(codes, vals, minlength=k) / np.maximum(n, 1)
+        m2 = np.bincount(codes, (vals - mean[codes]) ** 2, minlength=k)
+        lo, hi = np.full(k, np.inf), np.full(k, -np.inf)
+        np.minimum.at(lo, codes, vals)
+        np.maximum.at(hi, codes, vals)
+        # NaN != NaN, so missing keys are stored as None
+        self.combine([None if u != u else u for u in uniq], n, mean, m2,
+                     lo, hi)
+        return self
+
+    def update_df(self, df: pd.DataFrame, by: str, col: str) -> GroupedStats:
+        """Add the values of col in df, grouped by the values of col by."""
+        return self.update(df[by], df[col])
+
+    def merge(self, other: GroupedStats) -> GroupedStats:
+        """Merge other accumulator (e.g. of another partition) into this."""
+        self.combine(list(other.groups), other.n, other.mean, other.m2,
+                     other.min, other.max)
+        return self
+
+    def combine(self,
+                keys: List[Any],
+                n: np.ndarray,
+                mean: np.ndarray,
+                m2: np.ndarray,
+                lo: np.ndarray,
+                hi: np.ndarray):
+        """Combine per group summaries for keys into the accumulators."""
+        new = [key for key in keys if key not in self.groups]
+        if new:
+            start = len(self.groups)
+            self.groups.update((key, start + i) for i, key in enumerate(new))
+            pad = len(new)
+            self.n = np.concatenate([self.n, np.zeros(pad, np.int64)])
+            self.mean = np.concatenate([self.mean, np.zeros(pad)])
+            self.m2 = np.concatenate([self.m2, np.zeros(pad)])
+            self.min = np.concatenate([self.min, np.full(pad, np.inf)])
+            self.max = np.concatenate([self.max, np.full(pad, -np.inf)])
+
+        idx = np.array([self.groups[key] for key in keys], dtype=np.intp)
+        self.n[idx], self.mean[idx], self.m2[idx] = chan_merge(
+            self.n[idx], self.mean[idx], self.m2[idx], n, mean, m2)
+        self.min[idx] = np.minimum(self.min[idx], lo)
+        self.max[idx] = np.maximum(self.max[idx], hi)
+
+    def to_frame(self, ddof: int = 1) -> pd.DataFrame:
+        """Return count, mean, std, min and max per group, indexed by key."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = np.where(self.n > ddof, self.m2 / (self.n - ddof), np.nan)
+        return pd.DataFrame({'count': self.n,
+                             'mean': self.mean,
+                             'std': np.sqrt(var),
+                             'min': self.min,
+                             'max': self.max},
+                            index=pd.Index(list(self.groups)))
+
+
+def chan_merge(n_a: Any, mean_a: Any, m2_a: Any,
+               n_b: Any, mean_b: Any, m2_b: Any
+               ) -> Tuple[Any, Any, Any]:
+    """Combine (count, mean, m2) summaries; works on scalars and arrays."""
+    n = n_a + n_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = mean_b - mean_a
+        frac = np.where(n > 0, n_b / n, 0.0)
+        mean = mean_a + delta * frac
+        m2 = m2_a + m2_b + delta ** 2 * n_a * frac
+    if np.ndim(n) == 0:
+        return int(n), float(mean), float(m2)
+    return n, mean, m2
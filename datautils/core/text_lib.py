@@ -1,10 +1,23 @@
 """Text convenience functions.
 """
 
+from __future__ import annotations
+
 from enum import Enum  # type: ignore
 import logging  # type: ignore
+import re  # type: ignore
+from typing import (TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple,
+                    TypedDict)  # type: ignore
 
 from datautils.core import log_setup  # type: ignore
+from datautils.core.utils import lazy_import  # type: ignore
+
+if TYPE_CHECKING:
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+else:
+    np = lazy_import('numpy')
+    pd = lazy_import('pandas')
 
 
 ##########################################################################
@@ -19,6 +32,7 @@ logger = log_setup.init_file_log(__name__, logging.WARNING)
 class NumberStyle(Enum):
     US = 0
     EU = 1
+    PLAIN = 2
 
 
 def str_to_float(n: str, style: NumberStyle = NumberStyle.US) -> float:
@@ -38,3 +52,236 @@ def str_to_float(n: str, style: NumberStyle = NumberStyle.US) -> float:
 def str_to_int(n: str, style: NumberStyle = NumberStyle.US) -> int:
     """Parse string to integer."""
     return int(str_to_float(n, style))
+
+
+# currency symbols dropped by parse_floats and detect_number_style
+CURRENCY = '$\u20ac\u00a3\u00a5'
+
+# replacements per style, as in str_to_float: drop thousands separators
+# and stray quotes / punctuation, map the decimal separator to '.'
+STRIP_REPLACES = [(c, '') for c in '\'":;' + CURRENCY]
+NUMBER_REPLACES: Dict[NumberStyle, List[Tuple[str, str]]] = {
+    NumberStyle.US: [(',', '')] + STRIP_REPLACES,
+    NumberStyle.EU: [('.', ''), (',', '.')] + STRIP_REPLACES,
+    NumberStyle.PLAIN: STRIP_REPLACES}
+
+# values sampled to decide whether parsing unique values first pays off
+DEDUPE_SAMPLE = 10000
+DEDUPE_RATIO = 0.9
+
+
+def parse_floats(values: Any, style: NumberStyle = NumberStyle.US
+                 ) -> Tuple[Any, np.ndarray]:
+    """Parse a list, array or Series of strings to floats at once.
+    Parenthesized values are negative, and a '%' suffix divides by 100.
+    Returns (floats, positions of invalid values): a Series input gives a
+    Series with the same index, other inputs a float ndarray. Invalid
+    values become NaN; missing or blank values are NaN but not invalid.
+    If a sample shows repeated values, each unique value is parsed once.
+    """
+    arr = (values.to_numpy(dtype=object) if isinstance(values, pd.Series)
+           else np.asarray(values, dtype=object).ravel())
+
+    sample = arr[:DEDUPE_SAMPLE]
+    if len(pd.unique(sample)) < DEDUPE_RATIO * len(sample):
+        codes, uniq = pd.factorize(arr)
+        parsed, invalid_uniq = parse_values(uniq, style)
+        floats = np.append(parsed, np.nan)[codes]
+        invalid = np.flatnonzero(np.append(invalid_uniq, False)[codes])
+    else:
+        floats, invalid_mask = parse_values(arr, style)
+        invalid = np.flatnonzero(invalid_mask)
+
+    if isinstance(values, pd.Series):
+        return pd.Series(floats, index=values.index, name=values.name), invalid
+    return floats, invalid
+
+
+def parse_ints(values: Any, style: NumberStyle = NumberStyle.US
+               ) -> Tuple[Any, np.ndarray]:
+    """Parse a list, array or Series of strings to ints at once.
+    As parse_floats, truncating toward zero like str_to_int. Results are
+    nullable Int64, with invalid and missing values as NA.
+    """
+    floats, invalid = parse_floats(values, style)
+    ints = pd.array(np.trunc(np.asarray(floats)), dtype='Int64')
+    if isinstance(values, pd.Series):
+        return pd.Series(ints, index=values.index, name=values.name), invalid
+    return ints, invalid
+
+
+def parse_values(arr: np.ndarray, style: NumberStyle
+                 ) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse object array to floats, returning (floats, invalid mask).
+    Strings are joined so each replacement is one pass over one string,
+    then split and parsed with float(); only if that fails are they parsed
+    with pd.to_numeric, retrying failures for parentheses, '%' or blanks.
+    Non-str values (e.g. already numeric) are converted directly.
+    """
+    all_str = pd.api.types.infer_dtype(arr, skipna=False) == 'string'
+    is_str = (np.ones(len(arr), dtype=bool) if all_str else
+              np.fromiter((type(u) is str for u in arr), bool, len(arr)))
+    strs = (arr if all_str else arr[is_str]).tolist()
+    text = '\n'.join(strs)
+    if text.count('\n') == max(len(strs) - 1, 0):
+        for old, new in NUMBER_REPLACES[style]:
+            text = text.replace(old, new)
+        parts = text.split('\n') if len(strs) else []
+    else:  # strings with newlines, replace one by one
+        parts = [replace_all(s, NUMBER_REPLACES[style]) for s in strs]
+
+    floats = np.full(len(arr), np.nan)
+    invalid = np.zeros(len(arr), dtype=bool)
+    if not is_str.all():
+        other = arr[~is_str]
+        floats[~is_str] = pd.to_numeric(pd.Series(other, dtype=object),
+                                        errors='coerce')
+        invalid[~is_str] = np.isnan(floats[~is_str]) & pd.notna(other)
+    try:
+        floats[is_str] = np.fromiter(map(float, parts), float, len(parts))
+    except ValueError:
+        parsed = np.array(pd.to_numeric(pd.Series(parts, dtype=object),
+                                        errors='coerce'), dtype=float)
+        for i in np.flatnonzero(np.isnan(parsed)):
+            parsed[i], invalid[np.flatnonzero(is_str)[i]] = (
+                parse_number_text(parts[i]))
+        floats[is_str] = parsed
+    return floats, invalid
+
+
+def parse_number_text(t: str) -> Tuple[float, bool]:
+    """Parse replaced number text with a '%' suffix or in parentheses.
+    Returns (float, invalid); blank text is NaN but not invalid.
+    """
+    t, sign, scale = t.strip(), 1, 1
+    if t.startswith('(') and t.endswith(')'):
+        t, sign = t[1:-1].strip(), -1
+    if t.endswith('%'):
+        t, scale = t[:-1].strip(), 100
+    if not t:
+        return np.nan, sign != 1 or scale != 1
+    try:
+        return sign * float(t) / scale, False
+    except ValueError:
+        return np.nan, True
+
+
+def replace_all(s: str, replaces: List[Tuple[str, str]]) -> str:
+    """Apply replacements to s in order."""
+    for old, new in replaces:
+        s = s.replace(old, new)
+    return s
+
+
+##########################################################################
+# Number Style Detection
+
+# number text per style, after stripping sign, parens, '%' and currency
+STYLE_PATTERNS: Dict[NumberStyle, re.Pattern] = {
+    NumberStyle.PLAIN: re.compile(r'(?=.*\d)\d*(\.\d*)?'),
+    NumberStyle.US: re.compile(r'(?=.*\d)(\d{1,3}(,\d{3})+|\d*)(\.\d*)?'),
+    NumberStyle.EU: re.compile(r'(?=.*\d)(\d{1,3}(\.\d{3})+|\d*)(,\d*)?')}
+
+# styles reading the same text as different numbers: PLAIN and US agree
+RIVALS: Dict[NumberStyle, Tuple[NumberStyle, ...]] = {
+    NumberStyle.PLAIN: (NumberStyle.EU,),
+    NumberStyle.US: (NumberStyle.EU,),
+    NumberStyle.EU: (NumberStyle.US, NumberStyle.PLAIN)}
+
+STYLE_SAMPLE = 1000
+STYLE_CONFIDENCE = 0.5
+STYLE_STRIP = ' \t+-()%\'"' + CURRENCY
+
+# detected (style, confidence) per (source, column)
+STYLE_CACHE: Dict[Tuple[str, str], Tuple[NumberStyle, float]] = {}
+
+
+class CleanReport(TypedDict):
+    style: NumberStyle
+    confidence: float
+    invalid: np.ndarray
+
+
+def detect_number_style(values: Any,
+                        sample_size: int = STYLE_SAMPLE,
+                        source: Optional[str] = None,
+                        column: Optional[str] = None
+                        ) -> Tuple[NumberStyle, float]:
+    """Decide whether number strings are US, EU or PLAIN style.
+    Checks up to sample_size values, spread over the input, against each
+    style; digit-only values read the same in every style and are skipped.
+    Confidence is the share of the other values that fit the chosen style,
+    less the share fitting a rival style that would read them differently
+    (e.g. '1,234' fits both US and EU). PLAIN is preferred over US, and US
+    over EU, on ties. Missing or all digit-only values give PLAIN, with
+    confidence 0.0 or 1.0 respectively.
+    If source and column are given, the result is cached under that key
+    and returned without sampling on later calls (see clear_style_cache).
+    """
+    key: Optional[Tuple[str, str]] = None
+    if source is not None and column is not None:
+        key = (source, column)
+    if key is not None and key in STYLE_CACHE:
+        return STYLE_CACHE[key]
+
+    arr = (values.to_numpy(dtype=object) if isinstance(values, pd.Series)
+           else np.asarray(values, dtype=object).ravel())
+    if len(arr) > sample_size:
+        arr = arr[np.linspace(0, len(arr) - 1, sample_size).astype(int)]
+
+    texts = [t for t in (v.strip(STYLE_STRIP) for v in arr
+                         if type(v) is str) if t]
+    informative = [t for t in texts if not t.isdigit()]
+    if not informative:
+        ret = (NumberStyle.PLAIN, 1.0 if texts else 0.0)
+    else:
+        fits = {style: sum(p.fullmatch(t) is not None for t in informative)
+                for style, p in STYLE_PATTERNS.items()}
+        style = max(fits, key=fits.__getitem__)  # first in PLAIN, US, EU
+        rival = max(fits[r] for r in RIVALS[style])
+        ret = (style, (fits[style] - rival) / len(informative))
+
+    if key is not None:
+        STYLE_CACHE[key] = ret
+    return ret
+
+
+def clear_style_cache(source: Optional[str] = None):
+    """Clear cached styles for source, or for all sources if None."""
+    for key in [k for k in STYLE_CACHE if source is None or k[0] == source]:
+        del STYLE_CACHE[key]
+
+
+def clean_numbers(df: pd.DataFrame,
+                  cols: Optional[Sequence[str]] = None,
+                  source: Optional[str] = None,
+                  sample_size: int = STYLE_SAMPLE,
+                  min_confidence: float = STYLE_CONFIDENCE
+                  ) -> Tuple[pd.DataFrame, Dict[str, CleanReport]]:
+    """Parse number text cols of df to floats in one call.
+    Each col (default: all object and string cols) is parsed with
+    parse_floats in its detected style, cached per (source, col) if source
+    is given. Cols detected with less than min_confidence are left as is,
+    so text cols pass through. Returns (cleaned copy of df, report per
+    parsed col with style, confidence and positions of invalid values).
+    """
+    if cols is None:
+        cols = [c for c in df.columns
+                if pd.api.types.is_object_dtype(df[c]) or
+                pd.api.types.is_string_dtype(df[c])]
+
+    df_ = df.copy()
+    reports: Dict[str, CleanReport] = {}
+    for col in cols:
+        style, conf = detect_number_style(df[col], sample_size, source, col)
+        if conf < min_confidence:
+            logger.info(f'Clean numbers: {col} left as is, {style.name} ' +
+                        f'confidence {conf:.2f}')
+            continue
+        df_[col], invalid = parse_floats(df[col], style)
+        reports[col] = {'style': style, 'confidence': conf,
+                        'invalid': invalid}
+        if len(invalid):
+            logger.warning(f'Clean numbers: {col} has {len(invalid)} ' +
+                           f'invalid values as {style.name}')
+    return df_, reports
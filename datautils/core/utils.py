@@ -1,13 +1,16 @@
 """Utility functions.
 """
 
+from __future__ import annotations
+
 from collections import defaultdict  # type: ignore
 import csv  # type: ignore
 from dataclasses import dataclass  # type: ignore
 import importlib.util  # type: ignore
 from os import path  # type: ignore
-import pandas as pd  # type: ignore
-from typing import Callable, Dict, List, Tuple, TypeVar, Union  # type: ignore
+import sys  # type: ignore
+from typing import (TYPE_CHECKING, Any, Callable, Dict, List, Tuple,
+                    TypeVar, Union)  # type: ignore
 
 
 ##########################################################################
@@ -118,6 +121,31 @@ def load_module(path: str, name: str):
     return m
 
 
+def lazy_import(name: str) -> Any:
+    """Return module that is only executed on first attribute access.
+    Raises ModuleNotFoundError immediately if the module is not installed.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f'No module named {name}', name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    m = importlib.util.module_from_spec(spec)
+    sys.modules[name] = m
+    loader.exec_module(m)
+    return m
+
+
+if TYPE_CHECKING:
+    import pandas as pd  # type: ignore
+else:
+    pd = lazy_import('pandas')
+
+
 ##########################################################################
 # Strings
 
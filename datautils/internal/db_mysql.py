@@ -2,15 +2,23 @@
 For simplicity, only a subset of the MySQL specification is implemented.
 """
 
+from __future__ import annotations
+
 from dataclasses import dataclass  # type: ignore
 from enum import Enum  # type: ignore
 import logging  # type: ignore
-import pandas as pd  # type: ignore
-from typing import Any, List, Tuple, TypedDict, TypeVar  # type: ignore
+from typing import (TYPE_CHECKING, Any, Dict, List, Optional, Tuple, TypedDict,
+                    TypeVar)  # type: ignore
 # import pymysql  # type: ignore
 
-from datautils.core import log_setup  # type: ignore
-from datautils.core.utils import Error, OK, Status  # type: ignore
+from datautils.core import df_lib, log_setup  # type: ignore
+from datautils.core.utils import (Error, OK, Status,
+                                  lazy_import)  # type: ignore
+
+if TYPE_CHECKING:
+    import pandas as pd  # type: ignore
+else:
+    pd = lazy_import('pandas')
 
 
 ##########################################################################
@@ -206,16 +214,47 @@ def query(cur: Cursor, q: str, hdr: bool = False) -> RowsPair:
     return rows, status
 
 
-def query_df(cur: Cursor, q: str) -> Tuple[pd.DataFrame, Status]:
-    """Execute SQL query string and return result as DataFrame."""
-    rows, status = query(cur, q, True)
-    if status != OK() or not rows:
-        logger.error(f'Query {q} returned nvalid status or no data')
+# pymysql FIELD_TYPE codes: TIMESTAMP, DATE, DATETIME, NEWDATE
+DATE_TYPE_CODES = (7, 10, 12, 14)
+
+
+def query_df(cur: Cursor,
+             q: str,
+             dtypes: Optional[Dict[str, str]] = None,
+             cat_threshold: Optional[float] = None,
+             parse_dates: bool = False
+             ) -> Tuple[pd.DataFrame, Status]:
+    """Execute SQL query string and return result as DataFrame.
+    Rows are streamed from the cursor into typed cols chunk by chunk.
+    With parse_dates, date cols in the cursor description are parsed as
+    datetime64; explicit dtypes take precedence (see df_lib.typed_df).
+    """
+    status: Status
+    try:
+        cur.execute(q)
+        cols = [d[0] for d in cur.description]
+        dtypes_ = {**(description_dtypes(cur) if parse_dates else {}),
+                   **(dtypes if dtypes else {})}
+        df = df_lib.typed_df(cur, cols, dtypes_, cat_threshold)
+        status = OK()
+        logger.info(f'Query executed: {q}')
+    except Exception as e:
+        logger.error(f'Query exception: {q}; {e}')
+        df, status = pd.DataFrame(), Error(str(e))
+
+    if status != OK():
         return pd.DataFrame(), status
-    df = pd.DataFrame(rows[1:], columns=rows[0])
+    if df.empty:
+        logger.info(f'Query {q} returned no data')
     return df, status
 
 
+def description_dtypes(cur: Cursor) -> Dict[str, str]:
+    """Map date cols in the cursor description to datetime64 dtype."""
+    return {d[0]: 'datetime64[ns]' for d in (cur.description or [])
+            if d[1] in DATE_TYPE_CODES}
+
+
 ##########################################################################
 # Insert
 # Insert
@@ -2,15 +2,23 @@
 For simplicity, only a subset of the sqlite specification is implemented.
 """
 
+from __future__ import annotations
+
 from enum import Enum  # type: ignore
 import logging  # type: ignore
-import pandas as pd  # type: ignore
-from typing import List, Tuple, TypedDict, TypeVar  # type: ignore
+from typing import (TYPE_CHECKING, Dict, List, Optional, Tuple,
+                    TypedDict, TypeVar)  # type: ignore
 import re  # type: ignore
 import sqlite3  # type: ignore
 
-from datautils.core import log_setup  # type: ignore
-from datautils.core.utils import Error, OK, Status  # type: ignore
+from datautils.core import df_lib, log_setup  # type: ignore
+from datautils.core.utils import (Error, OK, Status,
+                                  lazy_import)  # type: ignore
+
+if TYPE_CHECKING:
+    import pandas as pd  # type: ignore
+else:
+    pd = lazy_import('pandas')
 
 
 ##########################################################################
@@ -194,16 +202,55 @@ def query(cur: Cursor, q: str, hdr: bool = False) -> RowsPair:
     return rows, status
 
 
-def query_df(cur: Cursor, q: str) -> Tuple[pd.DataFrame, Status]:
-    """Execute SQL query string and return result as DataFrame."""
-    rows, status = query(cur, q, True)
-    if status != OK() or not rows:
-        logger.error(f'Query {q} returned nvalid status or no data')
+def query_df(cur: Cursor,
+             q: str,
+             dtypes: Optional[Dict[str, str]] = None,
+             cat_threshold: Optional[float] = None,
+             parse_dates: bool = False
+             ) -> Tuple[pd.DataFrame, Status]:
+    """Execute SQL query string and return result as DataFrame.
+    Rows are streamed from the cursor into typed cols chunk by chunk.
+    With parse_dates, date cols declared in the table schema are parsed as
+    datetime64; explicit dtypes take precedence (see df_lib.typed_df).
+    """
+    status: Status
+    dtypes_ = {**(schema_dtypes(cur, q) if parse_dates else {}),
+               **(dtypes if dtypes else {})}
+    try:
+        result = cur.execute(q)
+        cols = [d[0] for d in result.description]
+        df = df_lib.typed_df(result, cols, dtypes_, cat_threshold)
+        status = OK()
+        logger.info(f'Query executed: {q}')
+    except Exception as e:
+        logger.error(f'Query exception: {q}; {e}')
+        df, status = pd.DataFrame(), Error(str(e))
+
+    if status != OK():
         return pd.DataFrame(), status
-    df = pd.DataFrame(rows[1:], columns=rows[0])
+    if df.empty:
+        logger.info(f'Query {q} returned no data')
     return df, status
 
 
+def schema_dtypes(cur: Cursor, q: str) -> Dict[str, str]:
+    """Map date cols of the queried table to datetime64 dtype.
+    Only single table queries are inspected; joins return no dtypes.
+    """
+    tables = re.findall(r'\bFROM\s+["`]?([A-Z0-9_]+)', q, re.IGNORECASE)
+    if len(tables) != 1 or re.search(r'\bJOIN\b', q, re.IGNORECASE):
+        return {}
+
+    try:
+        info = cur.execute(f'PRAGMA table_info("{tables[0]}")').fetchall()
+    except Exception as e:
+        logger.error(f'Schema dtypes exception: {q}; {e}')
+        return {}
+
+    return {name: 'datetime64[ns]' for _, name, dtype, *_ in info
+            if 'DATE' in dtype.upper() or 'TIMESTAMP' in dtype.upper()}
+
+
 ##########################################################################
 # Insert
 
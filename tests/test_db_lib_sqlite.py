@@ -4,7 +4,7 @@
 import logging  # type: ignore
 import pandas as pd  # type: ignore
 
-from datautils.core import db_lib, log_setup  # type: ignore
+from datautils.core import db_lib, df_lib, log_setup  # type: ignore
 from datautils.core.utils import OK  # type: ignore
 from datautils.internal import db_sqlite  # type: ignore
 
@@ -38,6 +38,19 @@ class TestSqlite:
         status = db.create(stmt)
         assert status == OK()
 
+    def test_deferred_connect(self, datadir):
+        """Test DB connects on first use only."""
+        path = datadir.join('test.db')
+        db = db_lib.DB(path)
+        assert db.connected is False
+        assert db.close() == OK()
+
+        ret, _ = db.query('SELECT * FROM SelectTest WHERE IntCol=7')
+        assert ret == [['HelloWorld', 7, 3.14]]
+        assert db.connected is True
+        assert db.close() == OK()
+        assert db.connected is False
+
     def test_query_once(self, datadir):
         """Test simple query_once variants."""
         path = datadir.join('test.db')
@@ -80,6 +93,39 @@ class TestSqlite:
         status = db.close()
         assert status == db_lib.OK()
 
+    def test_query_dtypes(self, datadir):
+        """Test typed DataFrame query results."""
+        path = datadir.join('test.db')
+        db = db_lib.DB(path)
+        db.create('CREATE TABLE Typed(Name TEXT, Day DATE, Qty INTEGER);')
+        db.insert('Typed', [['a', '2021-02-01', 1],
+                            ['a', '2021-02-02', 2],
+                            ['b', '2021-02-03', 3],
+                            ['a', '2021-02-04', 4]])
+
+        df, status = db.query('SELECT * FROM Typed', True, True)
+        assert status == OK()
+        assert df['Name'].dtype != 'category'
+        assert not pd.api.types.is_datetime64_any_dtype(df['Day'])
+
+        df, status = db.query('SELECT * FROM Typed', True, True,
+                              cat_threshold=df_lib.CAT_THRESHOLD,
+                              parse_dates=True)
+        assert status == OK()
+        assert df['Name'].dtype == 'category'
+        assert pd.api.types.is_datetime64_any_dtype(df['Day'])
+        assert df['Qty'].dtype == 'int64'
+
+        df, _ = db.query('SELECT * FROM Typed', True, True,
+                         {'Name': 'object', 'Qty': 'int8'})
+        assert df['Name'].dtype == 'object'
+        assert df['Qty'].dtype == 'int8'
+
+        df, status = db.query('SELECT * FROM Typed WHERE Qty > 9', True, True)
+        assert status == OK()
+        assert df.empty and list(df.columns) == ['Name', 'Day', 'Qty']
+        db.close()
+
     def test_bad_insert(self, datadir):
         """Test inserts with schema violations fail."""
 
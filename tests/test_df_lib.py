@@ -1,7 +1,12 @@
 """Pytest suite for db_lib.
 """
 
+import os  # type: ignore
+import sqlite3  # type: ignore
+
+import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
+import pytest  # type: ignore
 
 from datautils.core import df_lib  # type: ignore
 from datautils.core.utils import OK  # type: ignore
@@ -36,6 +41,179 @@ class TestComparison:
         assert d['retires'].equals(retires)
         assert status == OK()
 
+        d, _ = f(df1, df2, ['a'], ['c'], deltas=True)
+        assert d['mods'].values.tolist() == [[7, 'b', 8, 10]]
+
+    def test_diff_df_parallel(self):
+        """Test parallel diff_df matches serial diff_df."""
+        f = df_lib.diff_df
+        df1 = pd.DataFrame({'a': range(40),
+                            'b': [f'x{i % 4}' for i in range(40)],
+                            'c': [i / 2 for i in range(40)]})
+        df2 = df1.iloc[3:].copy()
+        df2.loc[[5, 17], 'b'] = 'changed'
+        df2.loc[[9], 'c'] = np.nan
+        df2.loc[40] = [99, 'new', 1.0]
+        df2 = df2.sample(frac=1, random_state=0)
+
+        d, _ = f(df1, df2, ['a'], [])
+        p, status = f(df1, df2, ['a'], [], n_workers=3)
+        assert status == OK()
+        assert p['mods'] == d['mods']
+        assert p['adds'].equals(d['adds'])
+        assert p['retires'].equals(d['retires'])
+
+        p, _ = f(df1, df2, ['a'], [], deltas=True, n_workers=2)
+        assert len(p['mods']) == 3
+
+    def test_diff_files(self, tmpdir, monkeypatch):
+        """Test diff_files matches diff_df on string data."""
+        f = df_lib.diff_files
+        df1 = pd.DataFrame([[i, i % 3, i * 2] for i in range(50)],
+                           columns=['a', 'b', 'c'])
+        df2 = df1.iloc[5:].copy()
+        df2.loc[[10, 20], 'c'] = -1
+        df2.loc[50] = [99, 0, 0]
+        path1, path2 = str(tmpdir.join('1.csv')), str(tmpdir.join('2.csv'))
+        df1.to_csv(path1, index=False)
+        df2.to_csv(path2, index=False)
+
+        d, status = f(path1, path2, ['a', 'b'], [], partitions=3)
+        e, _ = df_lib.diff_df(df1.astype(str), df2.astype(str),
+                              ['a', 'b'], [])
+        assert status == OK()
+        assert d['mods'] == e['mods']
+        assert d['adds'].values.tolist() == [['99', '0', '0']]
+        assert sorted(d['retires']['a'].tolist()) == ['0', '1', '2', '3', '4']
+
+        d2, _ = f(path1, path2, ['a', 'b'], [], partitions=3, n_workers=2)
+        assert d2['mods'] == d['mods']
+
+        _, status = f(path1, path2, ['a', 'b'], [], out_dir=str(tmpdir))
+        assert status == OK()
+        assert len(pd.read_csv(tmpdir.join('mods.csv'))) == 2
+
+        _, status = f(path1, path2, ['x'], [])
+        assert status != OK()
+
+        # spill files go under tmp_dir and are removed afterwards
+        spill, tmps = tmpdir.mkdir('spill'), []
+        spill_partitions = df_lib.spill_partitions
+        monkeypatch.setattr(df_lib, 'spill_partitions',
+                            lambda *args: (tmps.append(args[4]),
+                                           spill_partitions(*args)))
+        d3, _ = f(path1, path2, ['a', 'b'], [], partitions=3,
+                  tmp_dir=str(spill))
+        assert d3['mods'] == d['mods']
+        assert all(t.startswith(str(spill)) for t in tmps) and len(tmps) == 2
+        assert spill.listdir() == []
+
+    def test_fingerprints(self, tmpdir, monkeypatch):
+        """Test row fingerprints, store and diff_fingerprints."""
+        df1 = pd.DataFrame([[1, 'x', 1.5], [2, 'y', np.nan], [3, 'z', 0.0]],
+                           columns=['a', 'b', 'c'])
+        df2 = pd.DataFrame([[4, 'w', 1.0], [2, 'y', np.nan], [1, 'x', 2.5]],
+                           columns=['a', 'b', 'c'])
+
+        fps = df_lib.row_fingerprints(df1, ['a'])
+        assert list(fps.columns) == ['a', df_lib.FP_COL]
+        assert fps[df_lib.FP_COL].dtype == np.uint64
+        assert fps.equals(df_lib.row_fingerprints(df1.copy(), ['a']))
+
+        store = df_lib.FingerprintStore(str(tmpdir.join('fp.db')))
+        assert store.update(df1, ['a']) == OK()
+        loaded, status = store.load()
+        assert status == OK()
+        assert loaded.equals(fps)
+
+        fd, status = store.diff(df2, ['a'])
+        assert status == OK()
+        assert fd['adds']['a'].tolist() == [4]
+        assert fd['changed']['a'].tolist() == [1]
+        assert fd['retires']['a'].tolist() == [3]
+
+        store.update(df1, ['a'], ['c'])
+        fd, _ = store.diff(df2, ['a'], ['c'])
+        assert len(fd['changed']) == 0
+
+        # connections are closed, and ~ is expanded
+        conns, connect = [], df_lib.sqlite3.connect
+        monkeypatch.setattr(df_lib.sqlite3, 'connect',
+                            lambda p: conns.append(connect(p)) or conns[-1])
+        monkeypatch.setenv('HOME', str(tmpdir))
+        store = df_lib.FingerprintStore('~/fp2.db')
+        assert store.update(df1, ['a']) == OK()
+        assert store.load()[0].equals(fps)
+        assert tmpdir.join('fp2.db').exists() and len(conns) == 2
+        for conn in conns:
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute('SELECT 1')
+
+        d, _ = df_lib.diff_df(df1, df2, ['a'], [], fingerprint=True)
+        assert d['mods'] == [(['1'], [('c', '1.5', '2.5')])]
+
+    def test_snapshot_store(self, tmpdir, monkeypatch):
+        """Test SnapshotStore put / get across deltas and rebases."""
+        df1 = pd.DataFrame([[1, 'x', 1.5], [2, 'y', np.nan], [3, 'z', 0.0]],
+                           columns=['a', 'b', 'c'])
+        df2 = pd.DataFrame([[4, 'w', 1.0], [2, 'y', np.nan], [1, 'x', 2.5]],
+                           columns=['a', 'b', 'c'])
+        df3 = df2.assign(b=['w', 'v', 'x'], c=[1.0, 2.0, np.nan])
+        df4 = df3.assign(c=[3, 4, 5])
+        snaps = {'2021-01-04': df1, '2021-01-05': df2,
+                 '2021-01-06': df3, '2021-01-07': df4}
+
+        store = df_lib.SnapshotStore(str(tmpdir), ['a'], rebase_every=3)
+        for date, df in snaps.items():
+            assert store.put(date, df) == OK()
+        assert store.put('2021-01-05', df1) != OK()
+        assert ([e['base'] for e in store.manifest] ==
+                [True, False, False, True])
+
+        store = df_lib.SnapshotStore(str(tmpdir), ['a'], rebase_every=3)
+        assert store.dates() == list(snaps)
+        for date in ['2021-01-06', '2021-01-05', '2021-01-04', '2021-01-07']:
+            df, status = store.get(date)
+            assert status == OK()
+            assert df.equals(snaps[date].sort_values('a', ignore_index=True))
+
+        _, status = store.get('2021-01-08')
+        assert status != OK()
+
+        # dtype changes are stored as a new base, not forced into a delta
+        df5 = pd.DataFrame({'a': [1, 2], 'i': [1, 2], 'f': [True, False]})
+        df6 = df5.assign(i=[1.5, 2.0], f=[None, False])
+        store = df_lib.SnapshotStore(str(tmpdir.mkdir('dtypes')), ['a'])
+        assert store.put('2021-01-04', df5) == OK()
+        assert store.put('2021-01-05', df5.assign(i=[1, 3])) == OK()
+        assert store.put('2021-01-06', df6) == OK()
+        assert [e['base'] for e in store.manifest] == [True, False, True]
+        store.last = None
+        df, _ = store.get('2021-01-06')
+        assert df['i'].tolist() == [1.5, 2.0]
+        assert df['f'].tolist() == [None, False]
+
+        # applying such a delta directly infers a dtype for the new values
+        delta = pd.DataFrame({'a': [1, 1], 'col': ['i', 'f'],
+                              'old': [1, True],
+                              'new': pd.Series([1.5, None], dtype=object)})
+        dd = {'adds': df5.iloc[:0], 'retires': df5[['a']].iloc[:0],
+              'mods': delta}
+        df = df_lib.apply_diff(df5, dd, ['a'])
+        assert df['i'].tolist() == [1.5, 2.0]
+        assert df['f'].tolist() == [None, False]
+
+        store = df_lib.SnapshotStore(str(tmpdir), ['b'])
+        assert store.status != OK()
+        assert store.put('2021-01-08', df4) == store.status
+        assert store.get('2021-01-04')[1] == store.status
+
+        # ~ is expanded for the store directory
+        monkeypatch.setenv('HOME', str(tmpdir))
+        store = df_lib.SnapshotStore('~/positions', ['a'])
+        assert store.put('2021-01-04', df1) == OK()
+        assert os.path.exists(tmpdir / 'positions' / 'manifest.json')
+
     def test_find_mods(self):
         """Test find mod."""
         f = df_lib.find_mods
@@ -58,6 +236,132 @@ class TestComparison:
                   (['7'], [('b', '8', '10')])], OK())
                 )
 
+    def test_find_deltas(self):
+        """Test find_deltas and deltas_to_mods."""
+        f = df_lib.find_deltas
+        df1 = pd.DataFrame([[1, 2, 'x', np.nan],
+                            [4, 5, 'y', 1.5],
+                            [7, 8, 'z', np.nan]],
+                           columns=['a', 'b', 'c', 'd'])
+        df2 = pd.DataFrame([[7, 10, 'z', np.nan],
+                            [1, 2, 'w', np.nan],
+                            [4, 5, 'y', 2.5]],
+                           columns=['a', 'b', 'c', 'd'])
+
+        deltas, status = f(df1, df2, ['a'])
+        assert status == OK()
+        assert list(deltas.columns) == ['a', 'col', 'old', 'new']
+        assert deltas.values.tolist() == [[1, 'c', 'x', 'w'],
+                                          [4, 'd', 1.5, 2.5],
+                                          [7, 'b', 8, 10]]
+        assert (df_lib.deltas_to_mods(deltas, ['a']) ==
+                [(['1'], [('c', 'x', 'w')]),
+                 (['4'], [('d', '1.5', '2.5')]),
+                 (['7'], [('b', '8', '10')])])
+
+        deltas, status = f(df1, df1, ['a'])
+        assert len(deltas) == 0 and status == OK()
+
+        df3 = df2.assign(a=[7, 1, 5])
+        _, status = f(df1, df3, ['a'])
+        assert status != OK()
+
+    def test_find_deltas_tolerance(self):
+        """Test find_deltas and diff_df with numeric tolerance."""
+        df1 = pd.DataFrame({'a': [1, 2, 3], 'b': [1.0, -2.0, np.nan],
+                            'c': [10, 20, 30], 'd': ['x', 'y', 'z']})
+        df2 = pd.DataFrame({'a': [1, 2, 3], 'b': [1.00001, -2.1, np.nan],
+                            'c': [10, 20, 31], 'd': ['x', 'w', 'z']})
+
+        deltas, _ = df_lib.find_deltas(df1, df2, ['a'])
+        assert len(deltas) == 4
+
+        deltas, _ = df_lib.find_deltas(df1, df2, ['a'], epsilon=0.001)
+        assert deltas[['a', 'col']].values.tolist() == [[2, 'b'], [2, 'd'],
+                                                        [3, 'c']]
+
+        dd, _ = df_lib.diff_df(df1, df2, ['a'], [], epsilon_abs=1.0)
+        assert dd['mods'] == [(['2'], [('d', 'y', 'w')])]
+
+    def test_find_deltas_nullable(self):
+        """Test find_deltas and diff_df on nullable cols with pd.NA."""
+        df1 = pd.DataFrame({'k': [1, 2, 3],
+                            'v': pd.array([1, None, 3], dtype='Int64'),
+                            'b': pd.array([True, None, False],
+                                          dtype='boolean')})
+        df2 = df1.assign(v=pd.array([1, None, 4], dtype='Int64'))
+
+        dd, status = df_lib.diff_df(df1, df2, ['k'], [])
+        assert status == OK()
+        assert dd['mods'] == [(['3'], [('v', '3', '4')])]
+
+        df3 = df1.assign(b=pd.array([True, False, None], dtype='boolean'))
+        deltas, _ = df_lib.find_deltas(df1, df3, ['k'])
+        assert deltas[['k', 'col']].values.tolist() == [[2, 'b'], [3, 'b']]
+
+    def test_compact_mods(self, tmp_path):
+        """Test CompactMods from diff_df and save / load."""
+        df1 = pd.DataFrame([[1, 2, 'x', np.nan],
+                            [4, 5, 'y', 1.5],
+                            [7, 8, 'z', np.nan]],
+                           columns=['a', 'b', 'c', 'd'])
+        df2 = pd.DataFrame([[7, 10, 'z', np.nan],
+                            [1, 3, 'w', np.nan],
+                            [4, 5, 'y', 2.5]],
+                           columns=['a', 'b', 'c', 'd'])
+        mods = [(['1'], [('b', '2', '3'), ('c', 'x', 'w')]),
+                (['4'], [('d', '1.5', '2.5')]),
+                (['7'], [('b', '8', '10')])]
+
+        dd, status = df_lib.diff_df(df1, df2, ['a'], [], compact=True)
+        cm = dd['mods']
+        assert status == OK() and isinstance(cm, df_lib.CompactMods)
+        assert len(cm) == 3 and cm == mods and list(cm) == mods
+        assert cm[-1] == mods[-1]
+        assert cm.to_frame().values.tolist() == [[1, 'b', 2, 3],
+                                                 [1, 'c', 'x', 'w'],
+                                                 [4, 'd', 1.5, 2.5],
+                                                 [7, 'b', 8, 10]]
+
+        assert cm.old['b'].dtype == np.int64 and cm.new['d'].dtype == float
+        assert cm.old['c'].tolist() == ['x']
+
+        path = str(tmp_path / 'mods.npz')
+        assert cm.save(path) == OK()
+        loaded, status = df_lib.CompactMods.load(path)
+        assert status == OK() and loaded == mods and loaded == cm
+
+        # datetimes stay typed and missing strings round trip
+        df3 = df1.assign(c=['x', None, 'z'],
+                         t=pd.to_datetime(['2021-01-01'] * 3))
+        df4 = df3.assign(c=[None, 'y', 'z'],
+                         t=pd.to_datetime(['2021-01-02'] * 3))
+        cm, _ = df_lib.diff_df(df3, df4, ['a'], [], compact=True)
+        cm = cm['mods']
+        assert cm.old['t'].dtype.kind == 'M'
+        assert cm.save(path) == OK()
+        loaded, _ = df_lib.CompactMods.load(path)
+        assert loaded == cm and loaded.new['c'].tolist() == [None, 'y']
+
+        # datetime keys and values, and ints with None, str-convert as
+        # without compact
+        df5 = pd.DataFrame({'k': pd.to_datetime(['2020-01-01', '2020-01-02']),
+                            't': pd.to_datetime(['2021-01-01', '2021-01-02']),
+                            'n': pd.Series([1, None], dtype=object)})
+        df6 = df5.assign(t=pd.to_datetime(['2021-01-03', '2021-01-04']),
+                         n=pd.Series([None, 2], dtype=object))
+        dd, _ = df_lib.diff_df(df5, df6, ['k'], [])
+        cm, _ = df_lib.diff_df(df5, df6, ['k'], [], compact=True)
+        assert cm['mods'] == dd['mods'] and list(cm['mods']) == dd['mods']
+        assert dd['mods'][0] == (['2020-01-01 00:00:00'],
+                                 [('t', '2021-01-01 00:00:00',
+                                   '2021-01-03 00:00:00'),
+                                  ('n', '1', 'None')])
+        assert cm['mods'].old['n'].dtype == object
+
+        dd, _ = df_lib.diff_df(df1, df1, ['a'], [], compact=True)
+        assert len(dd['mods']) == 0 and dd['mods'] == []
+
     def test_gen_mod(self):
         """Test gen_mod"""
         f = df_lib.gen_mod
@@ -111,6 +415,32 @@ class TestFilters:
                            columns=['a', 'b', 'c'])
         assert f(df, **{'b': '2'}).equals(df2) is True
 
+    def test_filter_index(self):
+        """Test FilterIndex lookups."""
+        df = pd.DataFrame([[1, 'x', 3], [4, 'y', 6], [1, 'y', 9],
+                           [1, 'x', 0]],
+                          columns=['a', 'b', 'c'])
+        idx = df_lib.FilterIndex(df, ['a', 'b'])
+
+        assert idx.positions(a=1, b='x').tolist() == [0, 3]
+        assert idx.positions(a=1, b='x', c=0).tolist() == [3]
+        assert idx.positions(a=2, b='x').tolist() == []
+        assert idx.filter(a=4, b='y').equals(df.iloc[[1]])
+        assert idx.isin_positions([(1, 'y'), (1, 'x')]).tolist() == [0, 2, 3]
+        assert idx.isin([(9, 'z')]).empty
+
+        try:
+            idx.positions(a=1)
+            assert False
+        except ValueError:
+            pass
+
+        idx2 = df_lib.FilterIndex(df, ['a'])
+        assert idx2.isin([4]).equals(df_lib.filter(df, a=4))
+        df.loc[4] = [4, 'z', 1]
+        idx2.invalidate()
+        assert idx2.positions(a=4).tolist() == [1, 4]
+
     def test_filter_cols(self):
         """Test filter."""
         f = df_lib.filter_cols
@@ -148,6 +478,11 @@ class TestUniques:
         assert dup_df.equals(pd.DataFrame())
         assert uniq_df.equals(df)
 
+        _, _, sizes = f(df, ['TestKey'], True)
+        assert sizes.to_dict() == {1: 2}
+        _, _, sizes = f(df, ['TestKey', 'b'], True)
+        assert len(sizes) == 0
+
 
 class TestHelpers:
     """Test helper funcs."""
@@ -164,6 +499,129 @@ class TestHelpers:
                                [1, 2, 3],
                                [4, 5, 6]]
 
+    def test_df_to_matrix_mixed(self):
+        """Test df_to_matrix keeps per-col types and iter_rows is lazy."""
+        df = pd.DataFrame({'a': [1, 2, 3], 'b': [0.5, 1.5, 2.5],
+                           'c': ['x', 'y', 'z']})
+        m = df_lib.df_to_matrix(df)
+        assert m == [[1, 0.5, 'x'], [2, 1.5, 'y'], [3, 2.5, 'z']]
+        assert isinstance(m[0][0], int)
+
+        rows = df_lib.iter_rows(df, chunksize=2)
+        assert next(rows) == (1, 0.5, 'x')
+        assert list(rows) == [(2, 1.5, 'y'), (3, 2.5, 'z')]
+
+    def test_matrix_to_df(self):
+        """Test matrix_to_df from lists and row iterators."""
+        f = df_lib.matrix_to_df
+        m = [['a', 'b'], [1, 'x'], [2, 'y'], [3, 'x']]
+
+        assert f(m).equals(pd.DataFrame(m[1:], columns=m[0]))
+        assert f(m[1:], False).equals(pd.DataFrame(m[1:]))
+        assert f(m[:1]).columns.tolist() == ['a', 'b']
+
+        df = f(iter(m), dtypes={'a': 'int8', 'b': 'category'}, chunksize=2)
+        assert df['a'].tolist() == [1, 2, 3]
+        assert df['a'].dtype == 'int8'
+        assert df['b'].dtype == 'category'
+        assert df['b'].tolist() == ['x', 'y', 'x']
+
+        # dtypes do not depend on where chunk boundaries fall
+        m = [[None, 'x'], [None, None], [1, 'y'], [2, 3.5]]
+        for chunksize in (1, 2, 3):
+            df = f(m, False, chunksize=chunksize)
+            assert df.dtypes.tolist() == pd.DataFrame(m).dtypes.tolist()
+        assert f(m, False, chunksize=2)[0].tolist()[2:] == [1.0, 2.0]
+
+        # short rows are padded, long rows raise
+        m = [['a', 'b', 'c'], [1, 'x', 1.5], [2], [3, 'y']]
+        for chunksize in (1, 2, 3):
+            df = f(m, chunksize=chunksize)
+            assert df.equals(pd.DataFrame(m[1:], columns=m[0]))
+        with pytest.raises(ValueError, match='Row 1 has 3 values'):
+            f([[1, 2], [3, 4, 5]], False)
+
+    def test_optimize_memory(self):
+        """Test optimize_memory."""
+        f = df_lib.optimize_memory
+        df = pd.DataFrame({'i': [1, 2, 300, 4],
+                           'f': [0.5, 1.5, np.nan, 2.0],
+                           'g': [0.1, 0.2, 0.3, 0.4],
+                           's': ['a', 'a', 'b', 'a'],
+                           'n': ['1', '2', '3', None],
+                           'u': ['x1', 'y2', 'z3', 'w4']})
+
+        df_, report = f(df, parse_numeric=True)
+        assert [str(t) for t in df_.dtypes[:5]] == ['int16', 'float32',
+                                                    'float64', 'category',
+                                                    'float32']
+        assert df_['n'].tolist()[:3] == [1.0, 2.0, 3.0]
+        assert df_['u'].tolist() == df['u'].tolist()
+        assert df['i'].dtype == 'int64'
+        assert report.loc['i', 'bytes_after'] < report.loc['i',
+                                                           'bytes_before']
+        assert (report['bytes_after'] <= report['bytes_before']).all()
+
+        df_, _ = f(df, None, True, False)
+        assert df_ is df
+        assert df['s'].dtype != 'category'
+        assert df['n'].tolist()[0] == '1'
+
+        # strings are only parsed if they format back unchanged
+        df = pd.DataFrame({'z': ['01234', '5', None], 'd': ['2.50', '1', '3'],
+                           'e': ['2.5', '-1', None]})
+        df_, _ = f(df, None, parse_numeric=True)
+        assert df_['z'].tolist() == df['z'].tolist()
+        assert df_['d'].tolist() == df['d'].tolist()
+        assert df_['e'].dtype == 'float32'
+        assert f(df, None)[0]['e'].tolist() == df['e'].tolist()
+
+    def test_typed_df(self, monkeypatch):
+        """Test typed_df."""
+        f = df_lib.typed_df
+        rows = [['x', 1, 1.5, '2021-02-01'],
+                ['x', 2, 2.5, '2021-02-02'],
+                ['x', 3, 3.5, '2021-02-03'],
+                ['y', 4, 4.5, None]]
+        cols = ['a', 'b', 'c', 'd']
+
+        df = f(rows, cols, {'b': 'int16', 'd': 'datetime64[ns]'},
+               df_lib.CAT_THRESHOLD)
+        assert list(df.columns) == cols
+        assert df['a'].dtype == 'category'
+        assert df['b'].dtype == 'int16'
+        assert df['c'].dtype == 'float64'
+        assert df['d'].dtype == 'datetime64[ns]'
+        assert df['d'].isna().tolist() == [False, False, False, True]
+
+        assert f(rows, cols)['a'].dtype != 'category'
+        assert len(f([], cols)) == 0
+
+        # unparseable dates become NaT and are logged with their rows
+        logged = []
+        monkeypatch.setattr(df_lib.logger, 'warning', logged.append)
+        rows_ = rows + [['y', 5, 5.5, 'not a date']]
+        df = df_lib.rows_to_df(rows_, cols, {'d': 'datetime64[ns]'},
+                               chunksize=2)
+        assert df['d'].isna().tolist() == [False] * 3 + [True, True]
+        assert len(logged) == 1 and 'rows [4]' in logged[0]
+        assert 'not a date' in logged[0]
+
+    def test_typed_df_memory(self):
+        """Test typed cols take under half the memory of object cols."""
+        n = 10000
+        rows = [[f'name_{i % 20}', f'2021-02-{i % 28 + 1:02d}', i, i * 0.5]
+                for i in range(n)]
+        cols = ['name', 'day', 'n', 'x']
+
+        untyped = pd.DataFrame(rows, columns=cols)
+        typed = df_lib.typed_df(rows, cols, {'day': 'datetime64[ns]'},
+                                df_lib.CAT_THRESHOLD)
+        assert typed['name'].dtype == 'category'
+        ratio = (typed.memory_usage(deep=True).sum() /
+                 untyped.memory_usage(deep=True).sum())
+        assert ratio < 0.5
+
     def test_compare_dims(self):
         """Test compare_dims"""
         f = df_lib.compare_dims
@@ -192,6 +650,16 @@ class TestHelpers:
         triple = set([(1, 2)]), set([(4, 5)]), set([(7, 8)])
         assert f(df, df2, ['a', 'b']) == triple
 
+    def test_isin_keys(self):
+        """Test isin_keys matches on key tuples, not per column."""
+        f = df_lib.isin_keys
+        df = pd.DataFrame([[1, 2], [1, 5], [4, 2]], columns=['a', 'b'])
+        df2 = pd.DataFrame([[1, 2], [4, 5]], columns=['a', 'b'])
+
+        assert f(df, df2, ['a', 'b']).tolist() == [True, False, False]
+        assert f(df, df2, ['a']).tolist() == [True, True, True]
+        assert f(df, df2.iloc[:0], ['a', 'b']).tolist() == [False] * 3
+
     def test_cols_to_set(self):
         """Test cols_to_set."""
         f = df_lib.cols_to_set
@@ -231,3 +699,24 @@ class TestMerge:
                            columns=cols)
 
         assert (f(df, ['Shares'], ['Price'], []) == (df2)).all().all()
+
+    def test_merge_rows_by(self):
+        """Test merge_rows_by."""
+        f = df_lib.merge_rows_by
+
+        cols = ['Ticker', 'Shares', 'Price', 'Type']
+        df = pd.DataFrame([['A', 1, 2, 'C'],
+                           ['B', 5, 1, 'E'],
+                           ['A', 2, 3, 'D']],
+                          columns=cols)
+
+        merged = f(df, ['Ticker'], ['Shares'], ['Price'], ['Type'])
+        assert merged.values.tolist() == [['A', 3, 2.5, 'C'],
+                                          ['B', 5, 1.0, 'E']]
+        assert (merged.iloc[[0]] ==
+                df_lib.merge_rows(df[df['Ticker'] == 'A'], ['Shares'],
+                                  ['Price'], [])).all().all()
+
+        _, conflicts = f(df, ['Ticker'], ['Shares'], ['Price'], ['Type'],
+                         True)
+        assert conflicts.values.tolist() == [['A', 2]]
@@ -3,6 +3,9 @@
 
 import datetime as dt  # type: ignore
 
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
 from datautils.core import dt_lib  # type: ignore
 
 
@@ -44,6 +47,97 @@ class TestDate:
                                         dt.date(2021, 2, 2),
                                         dt.date(2021, 2, 4)]
 
+    def test_iter_dates(self):
+        """Test iter_dates with deltas, end dates and steps."""
+        f = dt_lib.iter_dates
+        d1 = dt.date(2021, 2, 1)
+        hs = [dt.date(2021, 2, 3)]
+
+        assert list(f(d1, 3, True, hs)) == dt_lib.get_dates(d1, 3, True, hs)
+        assert list(f(d1, -3, True)) == dt_lib.get_dates(d1, -3, True)[::-1]
+        assert list(f(d1, 0)) == [d1]
+
+        # end date, starting on a Saturday
+        assert list(f(dt.date(2021, 2, 6), dt.date(2021, 2, 9), True)) == [
+            dt.date(2021, 2, 8), dt.date(2021, 2, 9)]
+        assert list(f(dt.date(2021, 2, 9), dt.date(2021, 2, 6), True)) == [
+            dt.date(2021, 2, 9), dt.date(2021, 2, 8)]
+
+        # month steps clamp to month end and roll past weekends
+        assert list(f(dt.date(2021, 1, 31), 3, True, step='month')) == [
+            dt.date(2021, 2, 1), dt.date(2021, 3, 1), dt.date(2021, 3, 31),
+            dt.date(2021, 4, 30)]
+        assert list(f(d1, dt.date(2021, 2, 20), True, hs, 'week')) == [
+            dt.date(2021, 2, 1), dt.date(2021, 2, 8), dt.date(2021, 2, 15)]
+
+        # unbounded ranges stream
+        dates = f(d1, dt.date(2099, 1, 1), True)
+        assert next(dates) == d1 and next(dates) == dt.date(2021, 2, 2)
+
+        # numpy int deltas, e.g. taken from a DataFrame
+        assert list(f(d1, np.int64(-3), True)) == list(f(d1, -3, True))
+        assert (dt_lib.get_date(d1, np.int64(2), True) ==
+                dt_lib.get_date(d1, 2, True))
+        assert (dt_lib.get_biz_date(d1, np.int32(-1)) ==
+                dt_lib.get_biz_date(d1, -1))
+        assert dt_lib.get_dates(d1, np.int64(3)) == dt_lib.get_dates(d1, 3)
+
+    def test_get_date_array(self):
+        """Test array versions agree with get_date."""
+        fa = dt_lib.get_date_array
+        fg = dt_lib.get_date
+
+        # Fri, Sat, Sun, Mon, holiday Wed
+        ds = [dt.date(2021, 2, 5), dt.date(2021, 2, 6), dt.date(2021, 2, 7),
+              dt.date(2021, 2, 8), dt.date(2021, 2, 3)]
+        hs = [dt.date(2021, 2, 3), dt.date(2021, 2, 9)]
+
+        for skip_weekend in (True, False):
+            for h in (None, hs):
+                for delta in (-3, -1, 0, 1, 3):
+                    r = fa(ds, delta, skip_weekend, h)
+                    assert r.dtype == np.dtype('datetime64[D]')
+                    assert ([d.astype(dt.date) for d in r] ==
+                            [fg(d, delta, skip_weekend, h) for d in ds])
+
+        deltas = np.array([1, -1, 0, 2, -2])
+        r = dt_lib.get_biz_date_array(np.array(ds, dtype='datetime64[ns]'),
+                                      deltas, hs)
+        assert ([d.astype(dt.date) for d in r] ==
+                [dt_lib.get_biz_date(d, int(k), hs)
+                 for d, k in zip(ds, deltas)])
+
+        nat = np.array(['NaT'], dtype='datetime64[D]')
+        assert np.isnat(fa(nat, 1, True)[0])
+
+    def test_business_calendar(self):
+        """Test BusinessCalendar against scalar functions."""
+        hs = [dt.date(2021, 2, 3), dt.date(2021, 2, 9)]
+        start, end = dt.date(2021, 1, 1), dt.date(2021, 3, 31)
+        c = dt_lib.BusinessCalendar(hs, start, end)
+        assert c.valid is dt_lib.BusinessCalendar(hs, start, end).valid
+
+        # in range, Saturday start, and falling back outside the range
+        for d in (dt.date(2021, 2, 1), dt.date(2021, 2, 6),
+                  dt.date(2021, 3, 30)):
+            for n in (-5, -1, 0, 1, 5):
+                assert c.offset(d, n) == dt_lib.get_biz_date(d, n, hs)
+
+        assert c.is_business_day(dt.date(2021, 2, 2))
+        assert not c.is_business_day(dt.date(2021, 2, 3))
+        assert not c.is_business_day(dt.date(2021, 2, 6))
+        assert not c.is_business_day(dt.date(2022, 1, 1))
+
+        d1, d2 = dt.date(2021, 2, 1), dt.date(2021, 2, 10)
+        assert c.dates(d1, d2) == [dt.date(2021, 2, 1), dt.date(2021, 2, 2),
+                                   dt.date(2021, 2, 4), dt.date(2021, 2, 5),
+                                   dt.date(2021, 2, 8), dt.date(2021, 2, 10)]
+        assert c.count_between(d1, d2) == 5
+        assert c.count_between(d2, d1) == -5
+        assert c.count_between(d1, d1) == 0
+        assert (c.count_between(d1, dt.date(2021, 4, 5)) ==
+                np.busday_count(d1, dt.date(2021, 4, 5), holidays=hs))
+
 
 class TestParsers:
     """Test parser functions."""
@@ -57,6 +151,22 @@ class TestParsers:
         assert f('2020/Feb/21') == dt.date(2020, 2, 21)
         assert f('2020, Feb 21') == dt.date(2020, 2, 21)
         assert f('Feb  21  2020') == dt.date(2020, 2, 21)
+        assert f('Feb 30 2020') is None
+
+    def test_parse_date_names(self):
+        """Test parse_date_names for lists and Series."""
+        f = dt_lib.parse_date_names
+        d, d2 = dt.date(2020, 2, 21), dt.date(2020, 3, 1)
+        vals = ['Feb 21, 2020', '21 Feb, 2020', None, 'Mar 1 2020',
+                'Feb 21, 2020']
+
+        assert f(vals) == [d, d, None, d2, d]
+        assert f(vals, infer=True) == [d, None, None, d2, d]
+        assert f([]) == []
+
+        s = f(pd.Series(vals, index=list('abcde'), name='date'))
+        assert s.name == 'date' and list(s.index) == list('abcde')
+        assert s.tolist() == [d, d, None, d2, d]
 
     def test_maybe_date(self):
         """"Test maybe_date."""
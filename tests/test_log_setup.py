@@ -0,0 +1,110 @@
+"""Pytest suite for log_setup.
+"""
+
+import logging  # type: ignore
+import queue  # type: ignore
+
+from datautils.core import log_setup  # type: ignore
+
+
+##########################################################################
+
+class TestQueuedLog:
+    """Test queued logging."""
+
+    def test_queued_file_log(self, tmpdir):
+        """Test records reach the file through the shared listener."""
+        fpath = f'{tmpdir}/'
+        logger = log_setup.init_file_log('test_queued', logging.INFO,
+                                         fpath=fpath, queued=True)
+        logger.info('Query executed: SELECT 1')
+        logger.debug('not logged')
+        log_setup.stop_listener()
+
+        lines = tmpdir.join('test_queued.log').read().splitlines()
+        assert len(lines) == 1
+        assert lines[0].endswith('INFO - test_queued - Query executed: '
+                                 'SELECT 1')
+
+    def test_drop_policy(self):
+        """Test full queue drops new or old records."""
+        route = log_setup.RoutedQueue('r', queue.Queue(1),
+                                      log_setup.DROP_NEW)
+        h = log_setup.DroppingQueueHandler(route)
+        logger = logging.getLogger('test_drop_policy')
+        logger.propagate = False
+        logger.addHandler(h)
+
+        logger.warning('first')
+        logger.warning('second')
+        assert h.dropped == 1
+        assert route.queue.get_nowait().getMessage() == 'first'
+
+        h.policy = log_setup.DROP_OLD
+        logger.warning('third')
+        logger.warning('fourth')
+        assert route.dropped == 2
+        assert route.queue.get_nowait().getMessage() == 'fourth'
+
+
+class TestRateLimit:
+    """Test rate limit filter."""
+
+    def test_rate_limit(self):
+        """Test records are limited per message prefix."""
+        f = log_setup.RateLimitFilter(2, ['Query executed'])
+
+        def rec(msg, level=logging.INFO, lineno=0):
+            return logging.LogRecord('x', level, '', lineno, msg, None, None)
+
+        kept = [f.filter(rec(f'Query executed: {i}')) for i in range(5)]
+        assert kept == [True, True, False, False, False]
+        assert f.suppressed == 3
+
+        assert f.filter(rec('Connected to DB')) is True
+        assert f.filter(rec('Query executed: x', logging.ERROR)) is True
+        assert f.filter(rec('Query executed: y', lineno=1)) is True
+
+    def test_rate_limit_buckets(self):
+        """Test buckets are per call site and capped."""
+        f = log_setup.RateLimitFilter(1, max_buckets=2)
+
+        def rec(msg, lineno):
+            return logging.LogRecord('x', logging.INFO, 'm.py', lineno, msg,
+                                     None, None)
+
+        # formatted messages from one call site share a bucket
+        kept = [f.filter(rec(f'Query {i} returned no data', 1))
+                for i in range(3)]
+        assert kept == [True, False, False]
+        assert len(f.buckets) == 1
+
+        assert f.filter(rec('other', 2)) and f.filter(rec('another', 3))
+        assert len(f.buckets) == 2
+        assert ('x', 'm.py', 1) not in f.buckets
+
+    def test_rate_limit_slow(self, monkeypatch):
+        """Test rates below 1 per second still let records through."""
+        f = log_setup.RateLimitFilter(0.5)
+        now = [0.0]
+        monkeypatch.setattr(log_setup.time, 'monotonic', lambda: now[0])
+
+        def rec():
+            return logging.LogRecord('x', logging.INFO, '', 0, 'msg', None,
+                                     None)
+
+        assert f.filter(rec()) and not f.filter(rec())
+        now[0] = 1.0
+        assert not f.filter(rec())
+        now[0] = 2.0
+        assert f.filter(rec()) and not f.filter(rec())
+        now[0] = 100.0
+        assert f.filter(rec()) and not f.filter(rec())
+
+    def test_init_drop_policy(self, tmpdir):
+        """Test drop policy is set through init_file_log."""
+        logger = log_setup.init_file_log('test_init_drop', fpath=f'{tmpdir}/',
+                                         queued=True,
+                                         drop_policy=log_setup.DROP_OLD)
+        assert logger.handlers[-1].policy == log_setup.DROP_OLD
+        log_setup.stop_listener()
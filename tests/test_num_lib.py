@@ -2,6 +2,7 @@
 """
 
 import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
 
 from datautils.core import num_lib  # type: Ignore
 
@@ -22,6 +23,33 @@ class TestFloat:
         assert f(1.0, 0.9, 0.1) is False
         assert f(1.0, 0.99, 0.1) is True
         assert f(np.pi, 3.14159) is True
+        assert f(-1.0, -1.00001) is True
+        assert f(-1.0, -1.1, 0.01) is False
+
+    def test_approx_eq_array(self):
+        """Test approx_eq_array masks and deviation summary."""
+        f = num_lib.approx_eq_array
+        a = np.array([1.0, -2.0, np.nan, np.nan, 100.0])
+        b = np.array([1.00001, -2.1, np.nan, 3.0, 90.0])
+
+        mask, s = f(a, b)
+        assert mask.tolist() == [True, False, True, False, False]
+        assert mask.tolist() == [num_lib.approx_eq(x, y) or
+                                 (np.isnan(x) and np.isnan(y))
+                                 for x, y in zip(a, b)]
+        assert s['count'] == 5 and s['unequal'] == 3 and s['max_abs'] == 10
+        assert [d[0] for d in s['largest']] == [3, 4, 1]
+        assert len(f(a, b, top=1)[1]['largest']) == 1
+
+        df1 = pd.DataFrame({'x': [1.0, 2.0], 'y': [3, 4]}, index=['r1', 'r2'])
+        df2 = df1.assign(y=[3, 5])
+        mask, s = f(df1, df2, epsilon_abs=0.5)
+        assert mask.values.tolist() == [[True, True], [True, False]]
+        assert s['largest'] == [(('r2', 'y'), 4.0, 5.0, 1.0)]
+
+        mask, _ = f(df1['y'], df2['y'], epsilon=0.3)
+        assert mask.tolist() == [True, True] and list(mask.index) == ['r1',
+                                                                      'r2']
 
 
 class TestStatistics:
@@ -39,3 +67,121 @@ class TestStatistics:
 
         xs_set_ = f(xs_set, 5, 95)
         assert all([x >= 5 and x <= 95 for x in xs_set_]) is True
+
+        arr = np.array(xs)
+        assert (f(arr, 5, 95) == np.array(xs_)).all()
+        assert f(arr.reshape(2, 50), 10, 90, axis=1)[1].min() == 56
+
+        s = pd.Series([1.0, 2.0, np.nan, 100.0], index=list('abcd'))
+        assert f(s, 0, 50).tolist()[:2] == [1.0, 2.0]
+        assert np.isnan(f(s, 0, 50)['c']) and f(s, 0, 50)['d'] == 2.0
+
+        df = pd.DataFrame({'a': xs, 'b': [x * 10 for x in xs]})
+        df_ = f(df, 5, 95)
+        assert df_['a'].tolist() == xs_ and df_['b'].max() == 950
+        assert df_.dtypes.tolist() == df.dtypes.tolist()
+
+    def test_windsorize_by(self):
+        """Test windsorize_by matches windsorize per group."""
+        df = pd.DataFrame({'g': [1, 2] * 50,
+                           'v': [float(x) for x in range(100)],
+                           'w': list(range(100, 0, -1))})
+        df_ = num_lib.windsorize_by(df, ['g'], ['v', 'w'], 10, 90)
+
+        for _, grp in df.groupby('g'):
+            for col in ('v', 'w'):
+                assert (df_.loc[grp.index, col].tolist() ==
+                        num_lib.windsorize(grp[col], 10, 90).tolist())
+        assert df['v'].max() == 99.0
+
+    def test_quantile_sketch(self):
+        """Test QuantileSketch accuracy and merge."""
+        xs = np.random.default_rng(0).permutation(100000)
+        s = num_lib.QuantileSketch(seed=0)
+        for chunk in np.array_split(xs, 10):
+            s.update(chunk)
+        assert s.n == 100000
+        assert s.percentile(0) == 0 and s.percentile(100) == 99999
+        assert abs(s.percentile(50) - 50000) < 500
+        assert sum(len(level) for level in s.levels) < 5 * s.k
+
+        parts = [num_lib.QuantileSketch(seed=i).update(chunk)
+                 for i, chunk in enumerate(np.array_split(xs, 4))]
+        m = parts[0]
+        for p in parts[1:]:
+            m.merge(p)
+        lo, up = m.percentile([1, 99])
+        assert m.n == 100000 and abs(lo - 1000) < 500 and abs(up - 99000) < 500
+
+        assert np.isnan(num_lib.QuantileSketch().percentile(50))
+
+    def test_windsorize_chunks(self):
+        """Test two-pass streaming windsorize."""
+        xs = list(range(1, 101))
+
+        def chunks():
+            return (xs[i:i + 10] for i in range(0, 100, 10))
+
+        out = list(num_lib.windsorize_chunks(chunks, 5, 95))
+        assert len(out) == 10
+        assert sum(out, []) == num_lib.windsorize(xs, 5, 95)
+
+        def series_chunks():
+            return (pd.Series(xs[i:i + 50]) for i in (0, 50))
+
+        sketch = num_lib.QuantileSketch().update(xs)
+        out = list(num_lib.windsorize_chunks(series_chunks, 5, 95, sketch))
+        assert isinstance(out[0], pd.Series)
+        assert out[0].min() == 6 and out[1].max() == 95
+
+        # DataFrame and 2-D chunks are bound per col, as in windsorize
+        df = pd.DataFrame({'a': xs, 'b': [x * 1000 for x in xs]})
+
+        def df_chunks():
+            return (df.iloc[i:i + 25] for i in range(0, 100, 25))
+
+        out = list(num_lib.windsorize_chunks(df_chunks, 5, 95))
+        assert pd.concat(out).equals(num_lib.windsorize(df, 5, 95))
+
+        def arr_chunks():
+            return (df.to_numpy()[i:i + 25] for i in range(0, 100, 25))
+
+        out = list(num_lib.windsorize_chunks(arr_chunks, 5, 95))
+        assert np.array_equal(np.concatenate(out),
+                              num_lib.windsorize(df.to_numpy(), 5, 95))
+
+    def test_online_stats(self):
+        """Test OnlineStats against numpy, across chunks and merges."""
+        xs = np.random.default_rng(0).normal(1e6, 2.0, 10000)
+        s = num_lib.OnlineStats()
+        for chunk in np.array_split(xs, 7):
+            s.update(chunk)
+        s.update([np.nan])
+
+        assert s.n == 10000 and s.min == xs.min() and s.max == xs.max()
+        assert num_lib.approx_eq(s.mean, xs.mean(), 1e-12)
+        assert num_lib.approx_eq(s.variance(), xs.var(ddof=1), 1e-9)
+        assert num_lib.approx_eq(s.std(0), xs.std(), 1e-9)
+
+        parts = [num_lib.OnlineStats().update(chunk)
+                 for chunk in np.array_split(xs, 3)]
+        m = num_lib.OnlineStats().merge(num_lib.OnlineStats())
+        for p in parts:
+            m.merge(p)
+        assert m.n == s.n and num_lib.approx_eq(m.m2, s.m2, 1e-9)
+        assert np.isnan(num_lib.OnlineStats().update([1.0]).variance())
+
+    def test_grouped_stats(self):
+        """Test GroupedStats against groupby."""
+        df = pd.DataFrame({'g': ['a', 'b', None, 'a', 'b', 'a'],
+                           'v': [1.0, 2.0, 3.0, 4.0, np.nan, 7.0]})
+        g = num_lib.GroupedStats().update_df(df.iloc[:3], 'g', 'v')
+        g.merge(num_lib.GroupedStats().update_df(df.iloc[3:], 'g', 'v'))
+
+        out = g.to_frame()
+        assert list(out.index[:2]) == ['a', 'b'] and pd.isna(out.index[2])
+        assert out['count'].tolist() == [3, 1, 1]
+        assert out['mean'].tolist() == [4.0, 2.0, 3.0]
+        assert out.loc['a', 'std'] == 3.0 and np.isnan(out.loc['b', 'std'])
+        assert out['min'].tolist() == [1.0, 2.0, 3.0]
+        assert out['max'].tolist() == [7.0, 2.0, 3.0]
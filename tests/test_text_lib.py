@@ -1,6 +1,9 @@
 """Pytest suite for text_lib.
 """
 
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
 from datautils.core import text_lib
 
 
@@ -24,3 +27,85 @@ class TestNumbers:
         assert f('218.762,00', style=text_lib.NumberStyle.EU) == 218762
         assert f('218,762') == 218762
         assert f('762') == 762
+
+    def test_parse_floats(self):
+        """Test vectorized parse_floats."""
+        f = text_lib.parse_floats
+        vals = ['218,762.0001', '(1,000)', '12.5%', ' 42 ', 'abc', None, '',
+                7, '(50%)', '()']
+
+        floats, invalid = f(vals)
+        assert floats[:4].tolist() == [218762.0001, -1000.0, 0.125, 42.0]
+        assert floats[7:9].tolist() == [7.0, -0.5]
+        assert np.isnan(floats[[4, 5, 6, 9]]).all()
+        assert invalid.tolist() == [4, 9]
+
+        # repeated values are parsed once and broadcast back
+        s = pd.Series(['218.762,00', '(1.000,5)', 'x'] * 5, name='n')
+        floats, invalid = f(s, style=text_lib.NumberStyle.EU)
+        assert isinstance(floats, pd.Series) and floats.name == 'n'
+        assert floats[:2].tolist() == [218762.0, -1000.5]
+        assert invalid.tolist() == [2, 5, 8, 11, 14]
+
+        plain = ['218,762.0001', '762', '1,000,000.5']
+        assert (f(plain)[0].tolist() ==
+                [text_lib.str_to_float(v) for v in plain])
+
+    def test_parse_ints(self):
+        """Test vectorized parse_ints."""
+        ints, invalid = text_lib.parse_ints(['218,762.9', '(5)', 'x', None])
+        assert ints.dtype == 'Int64'
+        assert ints[:2].tolist() == [218762, -5]
+        assert ints[2] is pd.NA and ints[3] is pd.NA
+        assert invalid.tolist() == [2]
+
+    def test_detect_number_style(self):
+        """Test detect_number_style and its cache."""
+        f = text_lib.detect_number_style
+        NS = text_lib.NumberStyle
+
+        assert f(['1,234.5', '(2,000,000)', '3.25']) == (NS.US, 1.0)
+        assert f(['1.234,5', '2.000.000', '3,25%']) == (NS.EU, 1.0)
+        assert f(['1.5', '-2.25', '3']) == (NS.PLAIN, 1.0)
+        assert f(['12', '34']) == (NS.PLAIN, 1.0)
+        assert f(['1,234', '2,345']) == (NS.US, 0.0)
+        assert f(['abc', None]) == (NS.PLAIN, 0.0)
+        assert f(['1,5', '2,25', 'x'])[0] == NS.EU
+
+        # first result per (source, column) is reused
+        text_lib.clear_style_cache()
+        assert f(['1,5'], source='feed', column='px') == (NS.EU, 1.0)
+        assert f(['1.5'], source='feed', column='px') == (NS.EU, 1.0)
+        text_lib.clear_style_cache('feed')
+        assert f(['1.5'], source='feed', column='px') == (NS.PLAIN, 1.0)
+        text_lib.clear_style_cache()
+        assert text_lib.STYLE_CACHE == {}
+
+    def test_clean_numbers(self):
+        """Test one-call cleaning of number text cols."""
+        df = pd.DataFrame({'eu': ['1.234,5', '2,5', 'x'],
+                           'us': ['1,000.5', '(2)', '3'],
+                           'name': ['foo', 'bar', 'baz'],
+                           'n': [1, 2, 3]})
+        df_, reports = text_lib.clean_numbers(df)
+
+        assert sorted(reports) == ['eu', 'us']
+        assert reports['eu']['style'] == text_lib.NumberStyle.EU
+        assert reports['eu']['invalid'].tolist() == [2]
+        assert df_['eu'][:2].tolist() == [1234.5, 2.5]
+        assert df_['us'].tolist() == [1000.5, -2.0, 3.0]
+        assert df_['name'].tolist() == ['foo', 'bar', 'baz']
+        assert df['us'].tolist() == ['1,000.5', '(2)', '3']
+
+        _, reports = text_lib.clean_numbers(df, cols=['us'])
+        assert list(reports) == ['us']
+
+        # currency symbols are dropped by both detection and parsing
+        df = pd.DataFrame({'usd': ['$1,234.50', '$99.00', '($5)'],
+                           'eur': ['1.234,50 \u20ac', '99,00 \u20ac', '']})
+        df_, reports = text_lib.clean_numbers(df)
+        assert reports['usd']['style'] == text_lib.NumberStyle.US
+        assert reports['eur']['style'] == text_lib.NumberStyle.EU
+        assert df_['usd'].tolist() == [1234.5, 99.0, -5.0]
+        assert df_['eur'][:2].tolist() == [1234.5, 99.0]
+        assert all(len(r['invalid']) == 0 for r in reports.values())
@@ -1,6 +1,9 @@
 """PyTest suite for utils.py
 """
 
+import subprocess  # type: ignore
+import sys  # type: ignore
+
 from datautils.core import utils  # type: ignore
 
 ##########################################################################
@@ -87,3 +90,30 @@ class TestListUtils:
         assert f([[1, 2], [3, 4], [5, 6]]) is True
         assert f([[0], [1, 2]]) is False
         assert f([[], [1]]) is False
+
+
+class TestModules:
+    """Test module utility functions."""
+
+    def test_lazy_import(self):
+        """Test lazy_import."""
+        f = utils.lazy_import
+
+        m = f('json')
+        assert m.dumps([1]) == '[1]'
+
+        try:
+            f('no_such_module_xyz')
+            assert False
+        except ModuleNotFoundError:
+            pass
+
+    def test_lazy_core_imports(self):
+        """Test core modules do not load pandas at import time."""
+        script = ('import sys\n'
+                  'from datautils.core import db_lib, df_lib, num_lib\n'
+                  'pd = sys.modules.get("pandas")\n'
+                  'print(pd is None or type(pd).__name__ == "_LazyModule")')
+        out = subprocess.run([sys.executable, '-c', script],
+                             capture_output=True, text=True, check=True)
+        assert out.stdout.strip() == 'True'